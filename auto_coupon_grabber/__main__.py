@@ -0,0 +1,4 @@
+from auto_coupon_grabber.cli import main
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,53 +1,152 @@
 import os
+import time
+from datetime import datetime
 
 from cibus_api.cibus_api import CibusApi
+from cibus_api.purchase_pipeline import PurchasePipeline
+from common.common_checks import check_if_time_in_window, check_if_workday, get_now
+from token_extractor.api_token_extractor import TokenExtractionError, extract_token_from_api
 CIBUS_API_TOKEN=os.getenv("CIBUS_USERNAME")
 CIBUS_USERNAME=os.getenv("CIBUS_USERNAME")
 CIBUS_PASSWORD=os.getenv("CIBUS_PASSWORD")
+CIBUS_TOKEN_CACHE=os.getenv("CIBUS_TOKEN_CACHE")
+# Israel time of day between which a coupon may be purchased
+CIBUS_PURCHASE_WINDOW_START=os.getenv("CIBUS_PURCHASE_WINDOW_START", "00:00")
+CIBUS_PURCHASE_WINDOW_END=os.getenv("CIBUS_PURCHASE_WINDOW_END", "23:59:59")
+# Seconds a token that was just validated or obtained is trusted without checking it again
+TOKEN_TRUST_PERIOD = 60
 
 
+def get_purchase_skip_reason(now=None, window_start=CIBUS_PURCHASE_WINDOW_START, window_end=CIBUS_PURCHASE_WINDOW_END,
+                             utc_offset=3):
+    """Get why a coupon shouldn't be purchased now, or None if it may be."""
+    # One instant for both checks, so the day and the time of day are of the same timezone
+    now = now if now is not None else get_now(utc_offset)
+    if not check_if_workday(now):
+        return "not a workday"
+    if not check_if_time_in_window(window_start, window_end, now=now):
+        return "outside the purchase window"
+    return None
+
 
 class AutoCouponGrabber:
-    def __init__(self, username, password):
+    def __init__(self, username, password, token_cache=None, history_store=None, instrumentation=None):
         self.__username = username
         self.__password = password
-        self.__token=self._get_token_through_ui()
-        self.__cibus_api = CibusApi(token=self.__token)
+        self.__token_cache = token_cache
+        self.__history_store = history_store
+        self.__instrumentation = instrumentation
+        self.__cibus_api = self._get_api_from_cache()
+        # Either validated from the cache or just obtained by logging in
+        self.__token_checked_at = time.monotonic()
+        if self.__cibus_api is None:
+            self.__token = self._get_token()
+            if self.__token_cache is not None:
+                self.__token_cache.set(self.__username, self.__token)
+            self.__cibus_api = CibusApi(token=self.__token, instrumentation=self.__instrumentation)
+        else:
+            self.__token = self.__cibus_api.cookies["token"]
+
+    @property
+    def username(self):
+        return self.__username
+
+    @property
+    def cibus_api(self):
+        """Get the logged in API client."""
+        return self.__cibus_api
 
+    def _get_api_from_cache(self):
+        """Get an API client for the cached token, or None if it's missing or rejected."""
+        if self.__token_cache is None:
+            return None
+        token = self.__token_cache.get(self.__username)
+        if token is None:
+            return None
+        cibus_api = CibusApi(token=token, instrumentation=self.__instrumentation)
+        if cibus_api.is_token_valid():
+            return cibus_api
+        cibus_api.close()
+        self.__token_cache.invalidate(self.__username)
+        return None
+
+    def _get_token(self):
+        """Log in over HTTP, and only launch the browser if that fails."""
+        try:
+            return self._get_token_through_api()
+        except TokenExtractionError:
+            return self._get_token_through_ui()
+
+    def _get_token_through_api(self):
+        return extract_token_from_api(
+            username=self.__username,
+            password=self.__password,
+            instrumentation=self.__instrumentation
+        )
 
     def _get_token_through_ui(self):
+        # Imports Playwright, so it's only imported when the browser is actually needed
         from token_extractor.token_extractor import extract_token_from_ui
         return extract_token_from_ui(
             username=self.__username,
             password=self.__password
         )
 
-    def _check_day_validity(self):
-        ...
+    def refresh_token(self):
+        """Log in again, e.g. when the current token was rejected."""
+        if self.__token_cache is not None:
+            self.__token_cache.invalidate(self.__username)
+        self.__token = self._get_token()
+        if self.__token_cache is not None:
+            self.__token_cache.set(self.__username, self.__token)
+        self.__cibus_api.close()
+        self.__cibus_api = CibusApi(token=self.__token, instrumentation=self.__instrumentation)
+        self.__token_checked_at = time.monotonic()
+
+    def warm_up(self, connections=2):
+        """
+        Get ready for a purchase ahead of time: make sure the token is still accepted,
+        open pooled connections and prefetch the cart, so the purchase itself only
+        pays for the calls it can't avoid. A token checked in the last TOKEN_TRUST_PERIOD
+        seconds, e.g. by the constructor, isn't checked again.
+        """
+        if time.monotonic() - self.__token_checked_at > TOKEN_TRUST_PERIOD:
+            if not self.__cibus_api.is_token_valid():
+                self.refresh_token()
+            self.__token_checked_at = time.monotonic()
+        self.__cibus_api.warm_up(connections=connections)
+        self.__cibus_api.get_cart_info()
+
+    def _check_day_validity(self, day=None):
+        return check_if_workday(day)
 
-    def _check_time_validity(self):
-        ...
+    def _check_time_validity(self, now=None, window_start=CIBUS_PURCHASE_WINDOW_START,
+                             window_end=CIBUS_PURCHASE_WINDOW_END):
+        return check_if_time_in_window(window_start, window_end, now=now)
 
-    def _check_if_purchased_today(self):
-        from datetime import datetime
+    def _check_if_purchased_today(self, max_staleness=0):
         today = datetime.now().strftime("%d/%m/%Y")
+        if self.__history_store is not None:
+            # Only fetches the days since the last sync, then answers locally
+            self.__history_store.sync(self.__cibus_api, self.__username, min_interval=max_staleness)
+            return self.__history_store.has_purchase_on(self.__username, today)
+
         order_history = self.__cibus_api.get_order_history_in_time_range(
             from_date=today,
             to_date=today
         )
-        print(order_history)
+        return len(order_history.list) > 0
+
+    def prepare_purchase(self, restaurant_id=None, dishes=None):
+        """Fill the cart ahead of time, so purchase_coupon only has to place the order."""
+        return PurchasePipeline(self.__cibus_api).prepare(restaurant_id, dishes)
 
-    def purchase_coupon(self):
-        ...
+    def purchase_coupon(self, restaurant_id=None, dishes=None):
+        """Order `dishes`, or what's already in the cart, and return the PurchaseResult."""
+        return PurchasePipeline(self.__cibus_api).purchase(restaurant_id, dishes)
 
 
 
 if __name__ == '__main__':
-    auto_grabber = AutoCouponGrabber(
-        username=CIBUS_USERNAME,
-        password=CIBUS_PASSWORD
-    )
-    # auto_grabber._get_token_through_ui()
-
-    yes=auto_grabber._check_if_purchased_today()
-    print("banana")
\ No newline at end of file
+    from auto_coupon_grabber.cli import main
+    raise SystemExit(main(["check"]))
@@ -0,0 +1,256 @@
+"""
+Runs AutoCouponGrabber for many accounts over a bounded thread or process pool.
+"""
+import argparse
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from cibus_api.common.cibus_objects.cibus_dish import CibusDish
+
+PHASES = ("login", "check", "purchase")
+
+
+@dataclass
+class Account:
+    """Credentials of a single account."""
+    username: str
+    password: str
+    purchase_time: Optional[str] = None  # Israel time of day to purchase at, for the purchase scheduler
+    # What to order, otherwise whatever the account's cart holds is ordered
+    restaurant_id: Optional[int] = None
+    dishes: Optional[List[CibusDish]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Account':
+        """Create an Account instance from a dictionary."""
+        restaurant_id = data.get('restaurant_id')
+        return cls(
+            username=data.get('username', ''),
+            password=data.get('password', ''),
+            purchase_time=data.get('purchase_time') or None,
+            restaurant_id=int(restaurant_id) if restaurant_id not in (None, '') else None,
+            dishes=parse_dishes(data.get('dishes')) or None
+        )
+
+
+def parse_dish(value: Union[str, Dict[str, Any]]) -> CibusDish:
+    """Parse a dish given as a dictionary or as `DISH_ID:CATEGORY_ID:PRICE`."""
+    if isinstance(value, dict):
+        return CibusDish.from_dict(value)
+    try:
+        dish_id, dish_category, dish_price = value.split(':')
+        return CibusDish(dish_id=int(dish_id), dish_category=int(dish_category), dish_price=float(dish_price))
+    except ValueError:
+        raise ValueError(f"Invalid dish {value!r}, expected DISH_ID:CATEGORY_ID:PRICE")
+
+
+def parse_dishes(value: Union[None, str, List[Any]]) -> List[CibusDish]:
+    """Parse a list of dishes, or a `;` separated string of them as in CSV files."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = [dish for dish in value.split(';') if dish.strip()]
+    return [parse_dish(dish) for dish in value]
+
+
+@dataclass
+class AccountResult:
+    """Outcome of running the grabber for a single account."""
+    username: str
+    purchased_today: Optional[bool] = None
+    purchased: bool = False
+    skipped: Optional[str] = None  # why the purchase phase didn't run
+    purchase_result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    failed_phase: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def is_success(self) -> bool:
+        """Check if every phase completed without an error."""
+        return self.error is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the AccountResult instance to a dictionary."""
+        return {
+            'username': self.username,
+            'purchased_today': self.purchased_today,
+            'purchased': self.purchased,
+            'skipped': self.skipped,
+            'purchase_result': self.purchase_result,
+            'error': self.error,
+            'failed_phase': self.failed_phase,
+            'timings': self.timings
+        }
+
+
+@dataclass
+class BatchReport:
+    """Per-account results and aggregate timings of a batch run."""
+    results: List[AccountResult]
+    wall_time: float
+    max_workers: int
+    use_processes: bool
+    calls: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # per call type API stats, thread pools only
+
+    @property
+    def failures(self) -> List[AccountResult]:
+        """Get the results of accounts that failed."""
+        return [result for result in self.results if not result.is_success]
+
+    def get_phase_stats(self) -> Dict[str, Dict[str, float]]:
+        """Get count/mean/p50/p95/max seconds for each phase across all accounts."""
+        import statistics
+
+        stats = {}
+        for phase in PHASES:
+            durations = sorted(result.timings[phase] for result in self.results if phase in result.timings)
+            if not durations:
+                continue
+            stats[phase] = {
+                'count': len(durations),
+                'mean': statistics.fmean(durations),
+                'p50': durations[int(0.50 * (len(durations) - 1))],
+                'p95': durations[int(0.95 * (len(durations) - 1))],
+                'max': durations[-1],
+            }
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the BatchReport instance to a dictionary."""
+        return {
+            'accounts': len(self.results),
+            'succeeded': len(self.results) - len(self.failures),
+            'failed': len(self.failures),
+            'wall_time': self.wall_time,
+            'max_workers': self.max_workers,
+            'use_processes': self.use_processes,
+            'phases': self.get_phase_stats(),
+            'calls': self.calls,
+            'results': [result.to_dict() for result in self.results]
+        }
+
+
+def load_accounts(path: str) -> List[Account]:
+    """
+    Load accounts from a JSON list or a CSV file with `username,password` columns, and
+    optionally `purchase_time`, `restaurant_id` and `dishes`.
+    """
+    with open(path, encoding='utf-8', newline='') as accounts_file:
+        if path.lower().endswith('.csv'):
+            return [Account.from_dict(row) for row in csv.DictReader(accounts_file)]
+        return [Account.from_dict(row) for row in json.load(accounts_file)]
+
+
+def run_account(account: Account, purchase: bool = True, token_cache_path: Optional[str] = None,
+                instrumentation=None, force: bool = False) -> AccountResult:
+    """
+    Log in, check today's purchases and purchase for a single account. Unless `force`
+    is set, only purchases on workdays within the purchase window. Never raises.
+    """
+    from auto_coupon_grabber.auto_coupon_grabber import AutoCouponGrabber, get_purchase_skip_reason
+    from token_extractor.token_cache import TokenCache
+
+    result = AccountResult(username=account.username)
+    if purchase and not force:
+        result.skipped = get_purchase_skip_reason()
+        purchase = result.skipped is None
+    phase = PHASES[0]
+    try:
+        start = time.perf_counter()
+        grabber = AutoCouponGrabber(
+            username=account.username,
+            password=account.password,
+            token_cache=TokenCache(token_cache_path) if token_cache_path else None,
+            instrumentation=instrumentation
+        )
+        result.timings[phase] = time.perf_counter() - start
+
+        phase = PHASES[1]
+        start = time.perf_counter()
+        result.purchased_today = grabber._check_if_purchased_today()
+        result.timings[phase] = time.perf_counter() - start
+
+        if result.purchased_today and purchase:
+            result.skipped = "already purchased today"
+        elif purchase:
+            phase = PHASES[2]
+            start = time.perf_counter()
+            purchase_result = grabber.purchase_coupon(account.restaurant_id, account.dishes)
+            result.timings[phase] = time.perf_counter() - start
+            result.purchase_result = purchase_result.to_dict()
+            result.purchased = purchase_result.deal_id is not None
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+        result.failed_phase = phase
+        result.timings[phase] = time.perf_counter() - start
+    return result
+
+
+def run_batch(accounts: List[Account], max_workers: int = 4, use_processes: bool = False,
+              purchase: bool = True, token_cache_path: Optional[str] = None, force: bool = False) -> BatchReport:
+    """Run every account over a pool of `max_workers` threads or processes."""
+    from cibus_api.instrumentation import Instrumentation
+
+    if use_processes:
+        # Imports multiprocessing, which the thread pool and the CLI don't need
+        from concurrent.futures import ProcessPoolExecutor
+    executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    # Worker processes can't report to a shared instance, so calls are only aggregated for threads
+    instrumentation = None if use_processes else Instrumentation()
+    results: List[Optional[AccountResult]] = [None] * len(accounts)
+
+    start = time.perf_counter()
+    with executor_cls(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_account, account, purchase, token_cache_path, instrumentation, force): index for index, account in enumerate(accounts)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                # Only reachable when a worker process dies or the result can't be pickled
+                results[index] = AccountResult(username=accounts[index].username, error=f"{type(e).__name__}: {e}")
+
+    return BatchReport(
+        results=results,
+        wall_time=time.perf_counter() - start,
+        max_workers=max_workers,
+        use_processes=use_processes,
+        calls=instrumentation.get_summary() if instrumentation is not None else {}
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the coupon grabber for many accounts.")
+    parser.add_argument("accounts_file", help="JSON list or CSV file of username/password[/restaurant_id/dishes]")
+    parser.add_argument("--workers", type=int, default=4, help="pool size")
+    parser.add_argument("--processes", action="store_true", help="use a process pool instead of threads")
+    parser.add_argument("--check-only", action="store_true", help="skip the purchase phase")
+    parser.add_argument("--force", action="store_true", help="purchase on weekends and outside the purchase window")
+    parser.add_argument("--token-cache", help="path of a shared on-disk token cache")
+    parser.add_argument("--report", help="write the JSON report to this path instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_batch(
+        accounts=load_accounts(args.accounts_file),
+        max_workers=args.workers,
+        use_processes=args.processes,
+        purchase=not args.check_only,
+        token_cache_path=args.token_cache,
+        force=args.force
+    )
+    report_json = json.dumps(report.to_dict(), indent=2, ensure_ascii=False)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as report_file:
+            report_file.write(report_json)
+    else:
+        print(report_json)
+    return 1 if report.failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,257 @@
+"""
+Picks the menu items that use up as much of the daily budget as possible without going over.
+
+It's a grouped knapsack on the integer `price`, with the reachable totals kept as
+bitsets in Python ints, so adding an item to every partial selection at once is a
+single shift-or. Each category is solved on its own, honoring its min_items,
+max_items and is_mandatory and the is_mandatory and max_items of its items, and the
+categories are then combined. A typical menu takes a few milliseconds.
+
+Constraints are read as:
+- a category's min_items/max_items bound how many items are picked from it when any
+  are; max_items 0 means no limit. A mandatory category must be picked from.
+- an item's max_items bounds how many of it are picked, 0 meaning `default_max_quantity`.
+- mandatory items are always picked when their category is.
+"""
+from dataclasses import dataclass, field
+from math import floor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from cibus_api.common.cibus_objects.cibus_dish import CibusDish
+from cibus_api.common.cibus_objects.cibus_menu import MenuCategory, MenuItem, RestaurantMenuResponse
+
+
+@dataclass
+class DietFilter:
+    """Dietary requirements every picked item has to meet."""
+    vegan: bool = False
+    vegetarian: bool = False
+    gluten_free: bool = False
+    spice_levels: Optional[Iterable[str]] = None  # allowed spice_level_name values, None allows any
+
+    def matches(self, item: MenuItem) -> bool:
+        if self.vegan and not item.vegan:
+            return False
+        if self.vegetarian and not (item.vegetarian or item.vegan):
+            return False
+        if self.gluten_free and not item.gluten_free:
+            return False
+        if self.spice_levels is not None and item.spice_level_name \
+                and item.spice_level_name not in self.spice_levels:
+            return False
+        return True
+
+
+@dataclass
+class FillSelection:
+    """An item picked `quantity` times from a category."""
+    item: MenuItem
+    category_id: int
+    quantity: int = 1
+
+
+@dataclass
+class BudgetFill:
+    """The best selection of a menu for a budget."""
+    budget: int
+    total_price: int = 0
+    selections: List[FillSelection] = field(default_factory=list)
+    restaurant_id: Optional[int] = None
+    is_feasible: bool = True  # False when mandatory constraints can't be met within the budget
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.total_price
+
+    @property
+    def item_count(self) -> int:
+        return sum(selection.quantity for selection in self.selections)
+
+    def to_dishes(self) -> List[CibusDish]:
+        """Get the selection as the dishes to add to the cart, one per unit."""
+        return [
+            CibusDish(dish_id=selection.item.element_id, dish_category=selection.category_id,
+                      dish_price=selection.item.price)
+            for selection in self.selections for _ in range(selection.quantity)
+        ]
+
+
+def _fill_layers(prices: List[int], max_units: int, optional_budget: int, snapshots: Optional[list] = None) -> List[int]:
+    """
+    Get layers[k], the bitset of totals reachable with exactly k of the units.
+    With `snapshots`, the layers after every unit are appended to it.
+    """
+    mask = (1 << (optional_budget + 1)) - 1
+    layers = [1] + [0] * max_units
+    if snapshots is not None:
+        snapshots.append(list(layers))
+    for price in prices:
+        for count in range(max_units, 0, -1):
+            if layers[count - 1]:
+                layers[count] |= (layers[count - 1] << price) & mask
+        if snapshots is not None:
+            snapshots.append(list(layers))
+    return layers
+
+
+class _CategoryTable:
+    """Reachable totals of a single category, with what's needed to reconstruct them."""
+    def __init__(self, category_id: int, base_price: int, base_items: List[MenuItem], copies: List[MenuItem],
+                 prices: List[int], max_units: int, counts: Tuple[int, ...], reachable: int):
+        self.category_id = category_id
+        self.base_price = base_price  # price of the mandatory items
+        self.base_items = base_items
+        self.copies = copies  # one entry per optional unit
+        self.prices = prices
+        self.max_units = max_units
+        self.counts = counts  # allowed numbers of optional units
+        self.reachable = reachable  # bitset of the category's totals, base included
+
+    def reconstruct(self, total: int) -> List[MenuItem]:
+        """Get the items making up a reachable total of this category."""
+        # Only a few categories end up picked from, so their snapshots are computed again
+        # here instead of being kept for every category
+        remaining = total - self.base_price
+        snapshots = []
+        _fill_layers(self.prices, self.max_units, remaining, snapshots)
+        count = next(count for count in self.counts if snapshots[-1][count] >> remaining & 1)
+        picked = list(self.base_items)
+        for position in range(len(self.copies), 0, -1):
+            if snapshots[position - 1][count] >> remaining & 1:
+                continue  # reachable without this copy
+            picked.append(self.copies[position - 1])
+            remaining -= self.prices[position - 1]
+            count -= 1
+        return picked
+
+
+def _price(item: MenuItem) -> int:
+    return int(round(item.price or 0))
+
+
+def _build_table(category: MenuCategory, budget: int, diet: Optional[DietFilter],
+                 item_filter: Optional[Callable[[MenuItem], bool]], default_max_quantity: int
+                 ) -> Optional[_CategoryTable]:
+    """Solve a category on its own, or return None if it can't be picked from within the budget."""
+    mask = (1 << (budget + 1)) - 1
+    base_items, optional = [], []
+    for item in category.get_all_items():
+        price = _price(item)
+        if not item.is_mandatory and price > budget:
+            continue
+        allowed = (diet is None or diet.matches(item)) and (item_filter is None or item_filter(item))
+        quantity = item.max_items if item.max_items and item.max_items > 0 else default_max_quantity
+        if item.is_mandatory:
+            if not allowed:
+                return None  # picking from the category would force a filtered-out item
+            base_items.append(item)
+            quantity -= 1
+        if allowed and quantity > 0:
+            optional.append((item, price, quantity))
+
+    base_price = sum(_price(item) for item in base_items)
+    if base_price > budget:
+        return None
+    optional_budget = budget - base_price
+    copies, prices = [], []
+    for item, price, quantity in optional:
+        if price <= optional_budget:
+            copies.extend([item] * quantity)
+            prices.extend([price] * quantity)
+
+    max_total = category.max_items if category.max_items and category.max_items > 0 else len(base_items) + len(copies)
+    min_total = max(category.min_items or 0, 1)
+    # No more units fit in the budget than free ones plus what the cheapest paid one allows
+    paid_prices = [price for price in prices if price > 0]
+    fitting_units = len(prices) - len(paid_prices) + (optional_budget // min(paid_prices) if paid_prices else 0)
+    max_optional = min(max_total - len(base_items), len(copies), fitting_units)
+    min_optional = max(min_total - len(base_items), 0)
+    if max_optional < min_optional:
+        return None
+
+    layers = _fill_layers(prices, max_optional, optional_budget)
+    counts = tuple(count for count in range(min_optional, max_optional + 1) if layers[count])
+    reachable = 0
+    for count in counts:
+        reachable |= layers[count]
+    reachable = (reachable << base_price) & mask
+    if not reachable:
+        return None
+    return _CategoryTable(category.element_id, base_price, base_items, copies, prices, max_optional, counts, reachable)
+
+
+def _set_bits(bitset: int) -> List[int]:
+    positions = []
+    while bitset:
+        lowest = bitset & -bitset
+        positions.append(lowest.bit_length() - 1)
+        bitset ^= lowest
+    return positions
+
+
+def optimize_budget(menu: RestaurantMenuResponse, budget: float, diet: Optional[DietFilter] = None,
+                    item_filter: Optional[Callable[[MenuItem], bool]] = None, default_max_quantity: int = 1,
+                    restaurant_id: Optional[int] = None) -> BudgetFill:
+    """Pick the items of a menu whose total is the closest to `budget` without going over."""
+    budget = max(0, floor(budget))
+    mask = (1 << (budget + 1)) - 1
+    fill = BudgetFill(budget=budget, restaurant_id=restaurant_id)
+
+    # prefixes[i] is the bitset of totals reachable with the first i categories
+    prefixes = [1]
+    tables: List[Tuple[Optional[_CategoryTable], bool]] = []
+    for category in menu.get_all_categories():
+        table = _build_table(category, budget, diet, item_filter, default_max_quantity)
+        if table is None:
+            if category.is_mandatory:
+                fill.is_feasible = False
+                return fill
+            continue
+        optional = not category.is_mandatory
+        combined = prefixes[-1] if optional else 0
+        for total in _set_bits(table.reachable):
+            combined |= (prefixes[-1] << total) & mask
+        if not combined:
+            fill.is_feasible = False
+            return fill
+        tables.append((table, optional))
+        prefixes.append(combined)
+
+    total = prefixes[-1].bit_length() - 1
+    fill.total_price = total
+
+    # Walk the categories backwards, peeling off each one's share of the total
+    picked: Dict[Tuple[int, int], FillSelection] = {}
+    remaining = total
+    for position in range(len(tables), 0, -1):
+        table, optional = tables[position - 1]
+        previous = prefixes[position - 1]
+        if optional and previous >> remaining & 1:
+            continue  # nothing picked from this category
+        share = next(share for share in _set_bits(table.reachable) if share <= remaining
+                     and previous >> (remaining - share) & 1)
+        for item in table.reconstruct(share):
+            key = (table.category_id, item.element_id)
+            if key in picked:
+                picked[key].quantity += 1
+            else:
+                picked[key] = FillSelection(item=item, category_id=table.category_id)
+        remaining -= share
+
+    fill.selections = list(reversed(list(picked.values())))
+    return fill
+
+
+def score_menus(menus: Dict[int, RestaurantMenuResponse], budget: float, diet: Optional[DietFilter] = None,
+                item_filter: Optional[Callable[[MenuItem], bool]] = None,
+                default_max_quantity: int = 1) -> List[BudgetFill]:
+    """
+    Optimize every restaurant's menu for the same budget and return the feasible
+    results best first: the least budget left over, then the fewest items.
+    """
+    fills = [
+        optimize_budget(menu, budget, diet, item_filter, default_max_quantity, restaurant_id=restaurant_id)
+        for restaurant_id, menu in menus.items()
+    ]
+    feasible = [fill for fill in fills if fill.is_feasible and fill.selections]
+    return sorted(feasible, key=lambda fill: (fill.remaining, fill.item_count))
@@ -0,0 +1,229 @@
+"""
+Command line interface, run as `python -m auto_coupon_grabber <command>`.
+
+    check            whether each account already purchased today
+    purchase         purchase for every account that hasn't yet
+    history export   write the order history of a date range as JSON lines or CSV
+    token refresh    log in again and store the new token in the token cache
+
+Accounts come from --accounts (a JSON or CSV file, see batch_runner.load_accounts)
+or from CIBUS_USERNAME and CIBUS_PASSWORD, and every account's outcome is printed as
+a JSON line.
+
+It runs from cron every few minutes for many accounts, so startup time adds up:
+importing this module only loads what's needed to parse the arguments, and each
+command imports what it uses when it runs. Playwright is only imported when logging
+in over HTTP fails, and the menu classes aren't imported at all.
+benchmarks/startup_time.py measures this against a budget.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+
+def _parse_dish(value: str):
+    from auto_coupon_grabber.batch_runner import parse_dish
+
+    try:
+        return parse_dish(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _get_token_cache(args):
+    from token_extractor.token_cache import DEFAULT_TOKEN_CACHE_PATH, TokenCache
+
+    if args.no_token_cache:
+        return None
+    return TokenCache(args.token_cache or DEFAULT_TOKEN_CACHE_PATH)
+
+
+def _create_grabber(account, args):
+    from auto_coupon_grabber.auto_coupon_grabber import AutoCouponGrabber
+
+    return AutoCouponGrabber(username=account.username, password=account.password,
+                             token_cache=_get_token_cache(args))
+
+
+def _check(account, args):
+    return {'purchased_today': _create_grabber(account, args)._check_if_purchased_today()}
+
+
+def _purchase(account, args):
+    grabber = _create_grabber(account, args)
+    if grabber._check_if_purchased_today():
+        return {'purchased': False, 'skipped': "already purchased today"}
+    if args.dry_run:
+        return {'purchased': False, 'skipped': "dry run"}
+    # --dish applies to every account, otherwise each account orders its own dishes
+    if args.dishes:
+        result = grabber.purchase_coupon(args.restaurant_id, args.dishes)
+    else:
+        result = grabber.purchase_coupon(account.restaurant_id, account.dishes)
+    return {'purchased': result.deal_id is not None, 'purchase_result': result.to_dict()}
+
+
+class _HistoryWriter:
+    """Writes order history items of many accounts to one file, as JSON lines or CSV."""
+    def __init__(self, output_file, output_format: str):
+        self.output_file = output_file
+        self.output_format = output_format
+        self.__csv_writer = None
+        self.__lock = threading.Lock()
+
+    def write(self, username: str, item):
+        row = {'account': username, **item.to_dict()}
+        with self.__lock:
+            if self.output_format == 'jsonl':
+                self.output_file.write(json.dumps(row, ensure_ascii=False) + '\n')
+                return
+            if self.__csv_writer is None:
+                import csv
+                self.__csv_writer = csv.DictWriter(self.output_file, fieldnames=list(row), extrasaction='ignore')
+                self.__csv_writer.writeheader()
+            self.__csv_writer.writerow(row)
+
+
+def _export_history(account, args, writer: _HistoryWriter):
+    grabber = _create_grabber(account, args)
+    # Streamed, so a long range isn't held in memory
+    stream = grabber.cibus_api.stream_order_history_in_time_range(args.from_date, args.to_date)
+    items = 0
+    for item in stream:
+        writer.write(account.username, item)
+        items += 1
+    if not stream.is_success:
+        raise RuntimeError(f"Fetching the order history failed: {stream.msg}")
+    return {'items': items}
+
+
+def _refresh_token(account, args):
+    token_cache = _get_token_cache(args)
+    # Without a cached token the grabber logs in and caches the new token
+    token_cache.invalidate(account.username)
+    _create_grabber(account, args)
+    entry = token_cache.get_entry(account.username)
+    return {'expires_at': entry.expires_at if entry is not None else None}
+
+
+def _get_accounts(args, parser: argparse.ArgumentParser):
+    from auto_coupon_grabber.batch_runner import Account, load_accounts
+
+    if args.accounts:
+        return load_accounts(args.accounts)
+    username, password = os.getenv("CIBUS_USERNAME"), os.getenv("CIBUS_PASSWORD")
+    if not username or not password:
+        parser.error("pass --accounts or set CIBUS_USERNAME and CIBUS_PASSWORD")
+    return [Account(username=username, password=password)]
+
+
+def _run_accounts(accounts, run, workers: int, output=None) -> int:
+    """Run a command for every account and print each outcome as a JSON line. Returns the exit code."""
+    output = output if output is not None else sys.stdout
+
+    def _run(account):
+        outcome = {'username': account.username}
+        start = time.perf_counter()
+        try:
+            outcome.update(run(account))
+        except Exception as e:
+            outcome['error'] = f"{type(e).__name__}: {e}"
+        outcome['time'] = time.perf_counter() - start
+        return outcome
+
+    if workers > 1 and len(accounts) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(workers, len(accounts))) as executor:
+            outcomes = executor.map(_run, accounts)
+            failed = _print_outcomes(outcomes, output)
+    else:
+        failed = _print_outcomes(map(_run, accounts), output)
+    return 1 if failed else 0
+
+
+def _print_outcomes(outcomes, output) -> int:
+    failed = 0
+    for outcome in outcomes:
+        failed += 'error' in outcome
+        print(json.dumps(outcome, ensure_ascii=False), file=output, flush=True)
+    return failed
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m auto_coupon_grabber",
+                                     description="Check, purchase and export Cibus coupons of one or many accounts.")
+    parser.add_argument("--accounts", help="JSON list or CSV file of username/password, "
+                                           "instead of CIBUS_USERNAME and CIBUS_PASSWORD")
+    parser.add_argument("--token-cache", default=os.getenv("CIBUS_TOKEN_CACHE"),
+                        help="path of the on-disk token cache (default: CIBUS_TOKEN_CACHE or ~/.cache/auto_cibus)")
+    parser.add_argument("--no-token-cache", action="store_true", help="log in every time")
+    parser.add_argument("--workers", type=int, default=4, help="accounts run concurrently")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    commands.add_parser("check", help="check whether each account already purchased today")
+
+    purchase_parser = commands.add_parser("purchase", help="purchase for every account that hasn't yet today")
+    purchase_parser.add_argument("--restaurant-id", type=int, help="restaurant of --dish")
+    purchase_parser.add_argument("--dish", dest="dishes", action="append", type=_parse_dish,
+                                 metavar="DISH_ID:CATEGORY_ID:PRICE",
+                                 help="dish to order for every account, repeat for more. Without it each account "
+                                      "orders the dishes given in --accounts, or else whatever its cart holds")
+    purchase_parser.add_argument("--force", action="store_true", help="purchase on weekends and outside the window")
+    purchase_parser.add_argument("--dry-run", action="store_true", help="check, but don't purchase")
+
+    history_parser = commands.add_parser("history", help="order history commands")
+    history_commands = history_parser.add_subparsers(dest="history_command", metavar="command", required=True)
+    export_parser = history_commands.add_parser("export", help="write the order history of a date range")
+    export_parser.add_argument("--from", dest="from_date", required=True, help="first day, DD/MM/YYYY")
+    export_parser.add_argument("--to", dest="to_date", help="last day, DD/MM/YYYY (default: today)")
+    export_parser.add_argument("--format", dest="output_format", choices=("jsonl", "csv"), default="jsonl")
+    export_parser.add_argument("--output", default="-", help="file to write to, - for stdout")
+
+    token_parser = commands.add_parser("token", help="token cache commands")
+    token_commands = token_parser.add_subparsers(dest="token_command", metavar="command", required=True)
+    token_commands.add_parser("refresh", help="log in again and store the new token in the token cache")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "purchase" and args.dishes and args.restaurant_id is None:
+        parser.error("--dish requires --restaurant-id")
+    if args.command == "token" and args.no_token_cache:
+        parser.error("token refresh requires the token cache")
+
+    if args.command == "purchase" and not args.force:
+        # Checked before loading accounts, so runs outside the window cost no login
+        from auto_coupon_grabber.auto_coupon_grabber import get_purchase_skip_reason
+
+        skipped = get_purchase_skip_reason()
+        if skipped is not None:
+            print(json.dumps({'purchased': False, 'skipped': skipped}), flush=True)
+            return 0
+
+    accounts = _get_accounts(args, parser)
+    if args.command == "check":
+        return _run_accounts(accounts, lambda account: _check(account, args), args.workers)
+    if args.command == "purchase":
+        return _run_accounts(accounts, lambda account: _purchase(account, args), args.workers)
+    if args.command == "token":
+        return _run_accounts(accounts, lambda account: _refresh_token(account, args), args.workers)
+
+    # history export
+    if args.to_date is None:
+        from datetime import datetime
+        args.to_date = datetime.now().strftime("%d/%m/%Y")
+    to_stdout = args.output == "-"
+    output_file = sys.stdout if to_stdout else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        writer = _HistoryWriter(output_file, args.output_format)
+        # Outcomes go to stderr when stdout holds the history
+        return _run_accounts(accounts, lambda account: _export_history(account, args, writer), args.workers,
+                             output=sys.stderr if to_stdout else None)
+    finally:
+        if not to_stdout:
+            output_file.close()
@@ -0,0 +1,250 @@
+"""
+Fires each account's purchase at a precise time of day, after getting it ready in advance.
+
+`warm_up_lead` seconds before the target the account logs in (or reuses its cached
+token), re-validates the token, opens pooled connections and fills the cart,
+so at the target instant only the purchase itself is left. Every window waits in its
+own thread, and only the warm up is limited to `max_warm_ups` accounts at once. Waiting is a coarse sleep
+followed by a short spin, and every outcome reports how far from the target the
+purchase was fired and completed.
+"""
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from auto_coupon_grabber.batch_runner import Account, load_accounts
+from cibus_api.common.cibus_objects.cibus_dish import CibusDish
+from common.common_checks import check_if_workday, get_now, parse_time_of_day
+
+SPIN_THRESHOLD = 0.002  # seconds before the target to stop sleeping and start spinning
+MAX_SLEEP = 30  # re-read the wall clock at least this often, in case it was adjusted
+MAX_WARM_UPS = 32  # default limit of accounts logging in and warming up at once
+
+
+@dataclass
+class PurchaseWindow:
+    """When and how early to get ready to purchase for a single account."""
+    account: Account
+    purchase_time: str  # Israel time of day, HH:MM[:SS[.ffffff]]
+    warm_up_lead: float = 60.0  # seconds before purchase_time to log in and warm up
+    # Put in the cart while warming up, otherwise whatever the cart holds is ordered
+    restaurant_id: Optional[int] = None
+    dishes: Optional[List[CibusDish]] = None
+
+    def get_target(self, day: date, utc_offset: int = 3) -> datetime:
+        """Get the purchase instant of a day."""
+        return datetime.combine(day, parse_time_of_day(self.purchase_time),
+                                tzinfo=timezone(timedelta(hours=utc_offset)))
+
+
+@dataclass
+class PurchaseOutcome:
+    """What happened to a single account's purchase, with offsets from its target."""
+    username: str
+    target: str
+    purchased: bool = False
+    skipped: Optional[str] = None
+    error: Optional[str] = None
+    failed_phase: Optional[str] = None
+    fired_offset_ms: Optional[float] = None  # how late the purchase was started
+    completed_offset_ms: Optional[float] = None  # how long after the target the purchase returned
+    timings: Dict[str, float] = field(default_factory=dict)
+    purchase_result: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the PurchaseOutcome instance to a dictionary."""
+        return {
+            'username': self.username,
+            'target': self.target,
+            'purchased': self.purchased,
+            'skipped': self.skipped,
+            'error': self.error,
+            'failed_phase': self.failed_phase,
+            'fired_offset_ms': self.fired_offset_ms,
+            'completed_offset_ms': self.completed_offset_ms,
+            'timings': self.timings,
+            'purchase_result': self.purchase_result
+        }
+
+
+def wait_until(target_timestamp: float, stop_event: Optional[threading.Event] = None,
+               spin_threshold: float = SPIN_THRESHOLD) -> bool:
+    """
+    Wait until a unix timestamp: sleep until `spin_threshold` before it, then spin on
+    perf_counter. Returns False if `stop_event` was set before the target.
+    """
+    while True:
+        remaining = target_timestamp - time.time()
+        if remaining <= spin_threshold:
+            break
+        sleep_for = min(remaining - spin_threshold, MAX_SLEEP)
+        if stop_event is not None:
+            if stop_event.wait(sleep_for):
+                return False
+        else:
+            time.sleep(sleep_for)
+
+    # perf_counter is monotonic and high resolution, so the last stretch is measured with it
+    deadline = time.perf_counter() + (target_timestamp - time.time())
+    while time.perf_counter() < deadline:
+        time.sleep(0)  # releases the GIL, so accounts spinning together don't starve each other
+    return True
+
+
+class PurchaseScheduler:
+    """Runs the purchase windows of many accounts, once or every workday."""
+    def __init__(self, windows: List[PurchaseWindow], token_cache_path: Optional[str] = None,
+                 purchase: bool = True, utc_offset: int = 3, instrumentation=None, max_warm_ups: int = MAX_WARM_UPS):
+        self.windows = windows
+        self.warm_up_slots = threading.BoundedSemaphore(max_warm_ups)
+        self.token_cache_path = token_cache_path
+        self.purchase = purchase
+        self.utc_offset = utc_offset
+        self.instrumentation = instrumentation
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        """Abort waiting windows. Purchases already fired are not interrupted."""
+        self.stop_event.set()
+
+    def run_day(self, day: Optional[date] = None) -> List[PurchaseOutcome]:
+        """
+        Run every window of a day, each in its own thread since most of it is waiting,
+        and return their outcomes.
+        """
+        day = day if day is not None else get_now(self.utc_offset).date()
+        outcomes: List[Optional[PurchaseOutcome]] = [None] * len(self.windows)
+
+        def _run(position):
+            outcomes[position] = self.run_window(self.windows[position], day)
+
+        threads = [threading.Thread(target=_run, args=(position,), name=f'purchase-{position}')
+                   for position in range(len(self.windows))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def run_forever(self, on_outcomes: Optional[Callable[[date, List[PurchaseOutcome]], Any]] = None):
+        """Run the windows of every workday until stop() is called."""
+        while not self.stop_event.is_set():
+            today = get_now(self.utc_offset).date()
+            if check_if_workday(datetime.combine(today, datetime.min.time())):
+                outcomes = self.run_day(today)
+                if on_outcomes is not None:
+                    on_outcomes(today, outcomes)
+            # Sleep until just after the next midnight
+            next_day = datetime.combine(today + timedelta(days=1), datetime.min.time(),
+                                        tzinfo=timezone(timedelta(hours=self.utc_offset)))
+            wait_until(next_day.timestamp() + 1, self.stop_event)
+
+    def run_window(self, window: PurchaseWindow, day: date) -> PurchaseOutcome:
+        """Wait for, warm up and fire a single window. Never raises."""
+        from auto_coupon_grabber.auto_coupon_grabber import AutoCouponGrabber
+        from token_extractor.token_cache import TokenCache
+
+        target = window.get_target(day, self.utc_offset)
+        target_timestamp = target.timestamp()
+        outcome = PurchaseOutcome(username=window.account.username, target=target.isoformat())
+
+        if time.time() > target_timestamp:
+            outcome.skipped = "target already passed"
+            return outcome
+        if not wait_until(target_timestamp - window.warm_up_lead, self.stop_event):
+            outcome.skipped = "stopped"
+            return outcome
+
+        phase = "login"
+        try:
+            # Only a limited number of accounts log in and warm up at once, waiting isn't limited
+            with self.warm_up_slots:
+                start = time.perf_counter()
+                grabber = AutoCouponGrabber(
+                    username=window.account.username,
+                    password=window.account.password,
+                    token_cache=TokenCache(self.token_cache_path) if self.token_cache_path else None,
+                    instrumentation=self.instrumentation
+                )
+                outcome.timings[phase] = time.perf_counter() - start
+
+                phase = "warm_up"
+                start = time.perf_counter()
+                grabber.warm_up()
+                outcome.timings[phase] = time.perf_counter() - start
+
+                phase = "check"
+                start = time.perf_counter()
+                purchased_today = grabber._check_if_purchased_today()
+                outcome.timings[phase] = time.perf_counter() - start
+                if purchased_today:
+                    outcome.skipped = "already purchased today"
+                    return outcome
+                if not self.purchase:
+                    outcome.skipped = "check only"
+                    return outcome
+
+                phase = "prepare"
+                start = time.perf_counter()
+                grabber.prepare_purchase(window.restaurant_id, window.dishes)
+                outcome.timings[phase] = time.perf_counter() - start
+
+            if not wait_until(target_timestamp, self.stop_event):
+                outcome.skipped = "stopped"
+                return outcome
+            phase = "purchase"
+            start = time.perf_counter()
+            outcome.fired_offset_ms = (time.time() - target_timestamp) * 1000
+            result = grabber.purchase_coupon()
+            outcome.completed_offset_ms = (time.time() - target_timestamp) * 1000
+            outcome.timings[phase] = time.perf_counter() - start
+            outcome.purchased = True
+            outcome.purchase_result = result.to_dict()
+        except Exception as e:
+            outcome.error = f"{type(e).__name__}: {e}"
+            outcome.failed_phase = phase
+            outcome.timings[phase] = time.perf_counter() - start
+        return outcome
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Purchase for many accounts at a precise time of day.")
+    parser.add_argument("accounts_file", help="JSON list or CSV file of username/password[/purchase_time]")
+    parser.add_argument("--at", default="11:00:00",
+                        help="Israel time of day to purchase at, for accounts without a purchase_time")
+    parser.add_argument("--warm-up-lead", type=float, default=60.0, help="seconds before the target to warm up")
+    parser.add_argument("--once", action="store_true", help="only run today's windows")
+    parser.add_argument("--check-only", action="store_true", help="warm up and check, but don't purchase")
+    parser.add_argument("--token-cache", help="path of a shared on-disk token cache")
+    parser.add_argument("--max-warm-ups", type=int, default=MAX_WARM_UPS,
+                        help="accounts logging in and warming up at once")
+    args = parser.parse_args(argv)
+
+    windows = [
+        PurchaseWindow(account=account, purchase_time=account.purchase_time or args.at,
+                       warm_up_lead=args.warm_up_lead, restaurant_id=account.restaurant_id, dishes=account.dishes)
+        for account in load_accounts(args.accounts_file)
+    ]
+    scheduler = PurchaseScheduler(windows, token_cache_path=args.token_cache, purchase=not args.check_only,
+                                  max_warm_ups=args.max_warm_ups)
+
+    def _print_outcomes(day, outcomes):
+        print(json.dumps({'day': day.isoformat(), 'outcomes': [outcome.to_dict() for outcome in outcomes]},
+                         ensure_ascii=False), flush=True)
+
+    try:
+        if args.once:
+            _print_outcomes(get_now().date(), scheduler.run_day())
+        else:
+            scheduler.run_forever(_print_outcomes)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,142 @@
+"""
+Synthetic API responses for benchmarks, shaped like the real `prx_user_deals`,
+`prx_get_prev_orders` and restaurant menu payloads. Seeded, so runs are comparable.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+RESTAURANT_NAMES = ['סלט בר', 'פיצה רומא', 'שווארמה הכרמל', 'Sushi Bar', 'Burger House', 'מאפיית השכונה']
+DISH_WORDS = ['סלט', 'טוסט', 'כריך', 'פסטה', 'קינואה', 'חלומי', 'טונה', 'עוף', 'טבעוני', 'salad', 'wrap', 'bowl']
+SPICE_LEVELS = [None, None, 'mild', 'medium', 'hot']
+
+
+def make_history_item(index: int, rng: random.Random) -> Dict[str, Any]:
+    """A single entry of the `list` array of an order history response."""
+    when = datetime(2024, 1, 1) + timedelta(days=index % 365, minutes=rng.randint(8 * 60, 15 * 60))
+    price = rng.randint(20, 120)
+    return {
+        'rest_name': rng.choice(RESTAURANT_NAMES),
+        'date': when.strftime('%d/%m/%Y'),
+        'time': when.strftime('%H:%M'),
+        'deal_id': 1_000_000 + index,
+        'rule_name': 'daily',
+        'status': rng.choice(['approved', 'approved', 'approved', 'cancelled']),
+        'voucher_code': f"V{rng.randint(100000, 999999)}",
+        'display_price': str(price),
+        'coupon': 0,
+        'discount': 0,
+        'delivery_price': 0,
+        'price': price,
+        'etc_company_price': price * 0.8,
+        'etc_employee_price': price * 0.2,
+        'otl_price': 0,
+        'order_type': rng.choice([1, 2]),
+        'is_active': 1,
+        'restaurant_id': rng.randint(1, 5000),
+        'logo': 'logos/restaurant.png',
+        'refund_id': '',
+        'budget_activation_date': -1,
+        'is_3rd_party': False,
+        'icon': '',
+        'barcode': None,
+    }
+
+
+def make_order_history_response(items: int = 1000, seed: int = 0) -> Dict[str, Any]:
+    """A `prx_user_deals` response with `items` orders."""
+    rng = random.Random(seed)
+    return {
+        'head': {
+            'count': items,
+            'columns': [
+                {'name': 'מסעדה', 'type': 'string', 'key': 'rest_name'},
+                {'name': 'תאריך', 'type': 'date', 'key': 'date'},
+                {'name': None, 'type': 'number', 'key': 'price'},
+            ],
+        },
+        'list': [make_history_item(index, rng) for index in range(items)],
+        'code': 0,
+        'msg': '',
+        'http_code': 200,
+    }
+
+
+def make_order(index: int, rng: random.Random) -> Dict[str, Any]:
+    """A single order of a previous orders response."""
+    return {
+        'restaurant_id': rng.randint(1, 5000),
+        'favorit_id': 0,
+        'requested_objects': [[rng.randint(1, 99999), 0, rng.randint(1, 3), []] for _ in range(rng.randint(1, 4))],
+        'description': '',
+        'order_type': 1,
+        'deal_id': 2_000_000 + index,
+        'kitchen_type': rng.randint(1, 20),
+        'name': rng.choice(RESTAURANT_NAMES),
+        'address': 'תל אביב',
+        'rate': round(rng.uniform(3, 5), 1),
+        'rates': rng.randint(0, 3000),
+        'price': rng.randint(20, 120),
+        'date': (datetime(2024, 1, 1) + timedelta(days=index % 365)).strftime('%d/%m/%Y'),
+        'is_open': rng.randint(0, 1),
+        'is_kosher': rng.randint(0, 1),
+        'images': [],
+        'logos': {'logo': 'logos/restaurant.png'},
+        'is_web_order': True,
+        'is_approved': True,
+    }
+
+
+def make_previous_orders_response(orders: int = 500, seed: int = 0) -> Dict[str, Any]:
+    """A `prx_get_prev_orders` response with `orders` orders split over the two queues."""
+    rng = random.Random(seed)
+    all_orders = [make_order(index, rng) for index in range(orders)]
+    return {
+        'queue_orders': all_orders[:orders // 10],
+        'prev_orders': all_orders[orders // 10:],
+        'code': 0,
+        'msg': '',
+        'http_code': 200,
+    }
+
+
+def make_menu_element(element_id: int, element_type: int, rng: random.Random) -> Dict[str, Any]:
+    """A menu category (element_type 12) or item (element_type 13) without children."""
+    vegan = rng.random() < 0.2
+    return {
+        'name': ' '.join(rng.sample(DISH_WORDS, 2)),
+        'price': rng.randint(5, 90) if element_type == 13 else 0,
+        'order': element_id % 100,
+        'is_mandatory': int(rng.random() < 0.05),
+        'img': f"img/{element_id}.jpg",
+        'max_items': rng.choice([0, 1, 1, 2, 5]),
+        'free_items': 0,
+        'caloric_value': None,
+        'gluten_free': int(rng.random() < 0.15),
+        'vegan': int(vegan),
+        'vegetarian': int(vegan or rng.random() < 0.3),
+        'spice_level_name': rng.choice(SPICE_LEVELS),
+        'elm_hash': rng.getrandbits(31),
+        'elm_desc_hash': rng.getrandbits(31),
+        'element_id': element_id,
+        'element_type': element_type,
+        'min_items': 0,
+        'description': ' '.join(rng.choices(DISH_WORDS, k=6)),
+        'child_count': 0,
+        'has_freebies': False,
+    }
+
+
+def make_menu_response(categories: int = 20, items_per_category: int = 25, seed: int = 0) -> Dict[str, Any]:
+    """A restaurant menu response with `categories` categories of `items_per_category` items each."""
+    rng = random.Random(seed)
+    category_list = []
+    for category_index in range(categories):
+        category = make_menu_element(10_000 + category_index, 12, rng)
+        category['child_count'] = items_per_category
+        category['13'] = [
+            make_menu_element(100_000 + category_index * items_per_category + item_index, 13, rng)
+            for item_index in range(items_per_category)
+        ]
+        category_list.append(category)
+    return {'12': category_list, 'code': 0, 'msg': '', 'http_code': 200}
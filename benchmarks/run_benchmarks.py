@@ -0,0 +1,186 @@
+"""
+Benchmarks of the parsing, serialization and lookup hot paths.
+
+    python -m benchmarks.run_benchmarks [--size small|medium|large] [--output results.json]
+    python -m benchmarks.run_benchmarks --compare baseline.json [--threshold 0.15]
+
+Results are written as JSON so runs of different versions can be compared;
+--compare exits with status 1 when a benchmark got slower than the threshold.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+from benchmarks.fixtures import make_menu_response, make_order_history_response, make_previous_orders_response
+from cibus_api.common.cibus_objects.cibus_menu import RestaurantMenuResponse
+from cibus_api.common.cibus_objects.cibus_order_history import OrderHistoryResponse
+from cibus_api.common.cibus_objects.cibus_orders import PreviousOrdersResponse
+from cibus_api.common.cibus_objects.order_history_stream import OrderHistoryStream
+
+SIZES = {
+    'small': {'history_items': 500, 'orders': 200, 'categories': 10, 'items_per_category': 20},
+    'medium': {'history_items': 5000, 'orders': 2000, 'categories': 40, 'items_per_category': 50},
+    'large': {'history_items': 50000, 'orders': 20000, 'categories': 150, 'items_per_category': 100},
+}
+
+
+def time_call(function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Best and median wall time of `repeat` calls, in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {'best': min(durations), 'median': statistics.median(durations)}
+
+
+def peak_memory(function: Callable[[], Any]) -> int:
+    """Peak bytes allocated while running `function`, including what it returns."""
+    tracemalloc.start()
+    try:
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def bench_throughput(name: str, function: Callable[[], Any], units: int, repeat: int) -> Dict[str, Any]:
+    timing = time_call(function, repeat)
+    return {
+        'name': name,
+        'units': units,
+        'best_seconds': timing['best'],
+        'median_seconds': timing['median'],
+        'units_per_second': units / max(timing['best'], 1e-9),
+        'peak_memory_bytes': peak_memory(function),
+    }
+
+
+def bench_lookup(menu: RestaurantMenuResponse, lookups: int = 20000) -> Dict[str, Any]:
+    """Latency of find_item_by_id over random existing and missing ids."""
+    item_ids = [item.element_id for item in menu.get_all_items()]
+    rng = random.Random(1)
+    queries = [rng.choice(item_ids) if rng.random() < 0.9 else -1 for _ in range(lookups)]
+
+    menu.invalidate_index()
+    start = time.perf_counter()
+    menu.find_item_by_id(queries[0])
+    first_lookup = time.perf_counter() - start  # includes building the index
+
+    latencies = []
+    for element_id in queries:
+        start = time.perf_counter_ns()
+        menu.find_item_by_id(element_id)
+        latencies.append(time.perf_counter_ns() - start)
+    latencies.sort()
+    return {
+        'name': 'menu.find_item_by_id',
+        'units': lookups,
+        'first_lookup_seconds': first_lookup,
+        'mean_ns': statistics.fmean(latencies),
+        'p50_ns': latencies[len(latencies) // 2],
+        'p99_ns': latencies[int(len(latencies) * 0.99)],
+        'best_seconds': sum(latencies) / 1e9,
+    }
+
+
+def run(size: str = 'small', repeat: int = 5) -> Dict[str, Any]:
+    config = SIZES[size]
+    history = make_order_history_response(config['history_items'])
+    orders = make_previous_orders_response(config['orders'])
+    menu_data = make_menu_response(config['categories'], config['items_per_category'])
+    history_body = json.dumps(history, ensure_ascii=False).encode('utf-8')
+    menu_items = config['categories'] * config['items_per_category']
+
+    history_response = OrderHistoryResponse.from_dict(history)
+    orders_response = PreviousOrdersResponse.from_dict(orders)
+    menu_response = RestaurantMenuResponse.from_dict(menu_data)
+
+    def stream_history():
+        chunks = (history_body[i:i + 65536] for i in range(0, len(history_body), 65536))
+        return sum(1 for _ in OrderHistoryStream(chunks))
+
+    results = [
+        bench_throughput('order_history.from_dict', lambda: OrderHistoryResponse.from_dict(history),
+                         config['history_items'], repeat),
+        bench_throughput('order_history.to_dict', history_response.to_dict, config['history_items'], repeat),
+        bench_throughput('order_history.stream', stream_history, config['history_items'], repeat),
+        bench_throughput('previous_orders.from_dict', lambda: PreviousOrdersResponse.from_dict(orders),
+                         config['orders'], repeat),
+        bench_throughput('previous_orders.to_dict', orders_response.to_dict, config['orders'], repeat),
+        bench_throughput('menu.from_dict', lambda: RestaurantMenuResponse.from_dict(menu_data), menu_items, repeat),
+        bench_throughput('menu.from_dict_lazy', lambda: RestaurantMenuResponse.from_dict(menu_data, lazy=True),
+                         menu_items, repeat),
+        bench_throughput('menu.to_dict', menu_response.to_dict, menu_items, repeat),
+        bench_lookup(menu_response),
+    ]
+    return {'meta': get_meta(size, repeat), 'results': {result.pop('name'): result for result in results}}
+
+
+def get_meta(size: str, repeat: int) -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'size': size,
+        'repeat': repeat,
+        'git_revision': revision,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float):
+    """Return the (name, baseline seconds, current seconds) of benchmarks that got slower."""
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        if result['best_seconds'] > previous['best_seconds'] * (1 + threshold):
+            regressions.append((name, previous['best_seconds'], result['best_seconds']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SIZES), default='small', help="fixture size")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the best one is kept")
+    parser.add_argument("--output", help="write the JSON results to this path")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    results = run(args.size, args.repeat)
+    results_json = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(results_json)
+    else:
+        print(results_json)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(baseline, results, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+"""
+Bytes per instance of the slotted cibus_objects dataclasses, compared with the
+same dataclasses built without __slots__ (one __dict__ per instance).
+
+    python -m benchmarks.slots_memory [--count N] [--json]
+"""
+import argparse
+import dataclasses
+import json
+import tracemalloc
+
+from cibus_api.common.cibus_objects.cibus_menu import MenuElement, MenuItem, MenuCategory
+from cibus_api.common.cibus_objects.cibus_order_history import OrderHistoryItem
+from cibus_api.common.cibus_objects.cibus_orders import Order, RequestedObject
+
+SAMPLE_MENU_ELEMENT = {
+    'name': 'סלט חלומי', 'price': 52, 'order': 3, 'is_mandatory': 0, 'img': 'img/123.jpg',
+    'max_items': 1, 'free_items': 0, 'caloric_value': None, 'gluten_free': 1, 'vegan': 0,
+    'vegetarian': 1, 'spice_level_name': None, 'elm_hash': 912873, 'elm_desc_hash': 11873,
+    'element_id': 5521, 'element_type': 13, 'min_items': 0, 'description': 'עלים ירוקים, חלומי',
+    'child_count': 0, 'has_freebies': False,
+}
+SAMPLE_ORDER = {
+    'restaurant_id': 411, 'favorit_id': 0, 'requested_objects': [[5521, 0, 1, []]],
+    'description': '', 'order_type': 1, 'deal_id': 88112, 'kitchen_type': 2, 'name': 'Salad Bar',
+    'address': 'Tel Aviv', 'rate': 4.5, 'rates': 120, 'price': 52, 'date': '01/05/2025',
+    'is_open': 1, 'is_kosher': 1, 'images': [], 'logos': {'logo': 'logo.png'},
+    'is_web_order': True, 'is_approved': True,
+}
+SAMPLE_HISTORY_ITEM = {
+    'rest_name': 'Salad Bar', 'date': '01/05/2025', 'time': '12:31', 'deal_id': 88112,
+    'rule_name': 'daily', 'status': 'approved', 'voucher_code': 'A1B2', 'display_price': 52.0,
+    'coupon': 0.0, 'discount': 0.0, 'delivery_price': 0.0, 'price': 52.0,
+    'etc_company_price': 40.0, 'etc_employee_price': 12.0, 'otl_price': 0.0, 'order_type': 1,
+    'is_active': 1, 'restaurant_id': 411, 'logo': 'logo.png',
+}
+
+SAMPLES = {
+    MenuElement: lambda: MenuElement.from_dict(SAMPLE_MENU_ELEMENT),
+    MenuItem: lambda: MenuItem.from_dict(SAMPLE_MENU_ELEMENT),
+    MenuCategory: lambda: MenuCategory.from_dict(dict(SAMPLE_MENU_ELEMENT, element_type=12)),
+    Order: lambda: Order.from_dict(SAMPLE_ORDER),
+    RequestedObject: lambda: RequestedObject.from_list([5521, 0, 1, []]),
+    OrderHistoryItem: lambda: OrderHistoryItem.from_dict(SAMPLE_HISTORY_ITEM),
+}
+
+
+def make_dict_twin(cls):
+    """Rebuild a slotted dataclass as a regular one with the same fields."""
+    fields = [
+        (f.name, f.type, dataclasses.field(default=f.default, default_factory=f.default_factory, init=f.init))
+        for f in dataclasses.fields(cls)
+    ]
+    namespace = {'__post_init__': cls.__post_init__} if hasattr(cls, '__post_init__') else {}
+    return dataclasses.make_dataclass(f"{cls.__name__}WithDict", fields, namespace=namespace)
+
+
+def measure_bytes_per_object(factory, count):
+    """Average bytes allocated per object when building `count` of them."""
+    factory()  # warm up caches so they aren't counted
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # Don't count the list holding the objects
+    allocated -= objects.__sizeof__()
+    return allocated / count
+
+
+def run(count=50000):
+    results = []
+    for cls, sample in SAMPLES.items():
+        instance = sample()
+        values = {f.name: getattr(instance, f.name) for f in dataclasses.fields(cls) if f.init}
+        twin = make_dict_twin(cls)
+
+        # Field values are shared, so only the per-instance overhead is measured
+        slotted = measure_bytes_per_object(lambda: cls(**values), count)
+        with_dict = measure_bytes_per_object(lambda: twin(**values), count)
+        results.append({
+            'class': cls.__name__,
+            'fields': len(dataclasses.fields(cls)),
+            'bytes_before': round(with_dict, 1),
+            'bytes_after': round(slotted, 1),
+            'saved_pct': round(100 * (1 - slotted / with_dict), 1),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50000, help="objects built per class")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    results = run(args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'class':<18}{'fields':>7}{'before':>10}{'after':>10}{'saved':>8}")
+    for row in results:
+        print(f"{row['class']:<18}{row['fields']:>7}{row['bytes_before']:>10}{row['bytes_after']:>10}{row['saved_pct']:>7}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Cold start time of the `python -m auto_coupon_grabber` commands, against a budget.
+
+    python -m benchmarks.startup_time [--repeat 5] [--budget-scale 1.0] [--output results.json]
+
+Every command runs in a fresh interpreter under `-X importtime`, against a local
+mock server, so the time spent importing is measured apart from the calls. Exits
+with status 1 when a command's import time is over its budget, or when it imports
+a module it shouldn't need (Playwright, aiohttp, the menu classes).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from mock_server.pluxee_server import MockPluxeeServer, MockServerConfig
+
+# Import time budgets in milliseconds, not counting what the interpreter imports on its own.
+# The commands that make calls measured 105-165 ms, about 110 ms of it importing requests, which
+# they all need. The budgets leave about 50% over the slowest measurement, so only a regression fails.
+BUDGETS_MS = {
+    'help': 20,
+    'check': 250,
+    'purchase': 250,
+    'history export': 250,
+    'token refresh': 250,
+}
+
+COMMANDS = {
+    'help': ['--help'],
+    'check': ['check'],
+    'purchase': ['purchase', '--force', '--dry-run'],
+    'history export': ['history', 'export', '--from', '01/01/2024', '--output', os.devnull],
+    'token refresh': ['token', 'refresh'],
+}
+
+# Only needed by the browser login, the async client and menu handling
+FORBIDDEN_MODULES = ('playwright', 'aiohttp', 'cibus_api.common.cibus_objects.cibus_menu')
+
+
+def parse_importtime(stderr: str, interpreter_modules=frozenset()) -> Dict[str, Any]:
+    """
+    Get the total import time in ms, the imported modules and the heaviest top level
+    imports, leaving out the top level imports in `interpreter_modules`.
+    """
+    modules, top_level = [], []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append(name.strip())
+        if not name[1:].startswith(' ') and name.strip() not in interpreter_modules:  # nested imports are indented
+            top_level.append((int(cumulative) / 1000, name.strip()))
+    top_level.sort(reverse=True)
+    return {
+        'import_ms': sum(duration for duration, _ in top_level),
+        'modules': modules,
+        'heaviest': [{'module': name, 'ms': duration} for duration, name in top_level[:5]]
+    }
+
+
+def get_interpreter_modules(env: Dict[str, str]) -> frozenset:
+    """Get the modules the interpreter imports before running anything."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'pass'],
+                             env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return frozenset(parse_importtime(process.stderr)['modules'])
+
+
+def measure(command: List[str], env: Dict[str, str], repeat: int, interpreter_modules=frozenset()) -> Dict[str, Any]:
+    """Run a command `repeat` times and keep the run with the least import time."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'auto_coupon_grabber', *command],
+                                 env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall_ms = (time.perf_counter() - start) * 1000
+        result = parse_importtime(process.stderr, interpreter_modules)
+        result.update(wall_ms=wall_ms, returncode=process.returncode)
+        if best is None or result['import_ms'] < best['import_ms']:
+            best = result
+    return best
+
+
+def run(repeat: int, budget_scale: float) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    with MockPluxeeServer(MockServerConfig()) as server, tempfile.TemporaryDirectory() as temp_dir:
+        env = dict(
+            os.environ,
+            CIBUS_AUTH_URL=server.auth_url,
+            CIBUS_DATA_URL=server.data_url,
+            CIBUS_USERNAME='startup', CIBUS_PASSWORD='startup',
+            CIBUS_TOKEN_CACHE=os.path.join(temp_dir, 'tokens.json'),
+            PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')]))
+        )
+        interpreter_modules = get_interpreter_modules(env)
+        for name, command in COMMANDS.items():
+            result = measure(command, env, repeat, interpreter_modules)
+            modules = result.pop('modules')
+            result['module_count'] = len(modules)
+            result['forbidden'] = sorted({module for module in modules
+                                          for forbidden in FORBIDDEN_MODULES
+                                          if module == forbidden or module.startswith(forbidden + '.')})
+            result['budget_ms'] = BUDGETS_MS[name] * budget_scale
+            result['over_budget'] = result['import_ms'] > result['budget_ms']
+            results[name] = result
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per command, the fastest one is kept")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply the budgets, for slower machines")
+    parser.add_argument("--output", help="write the JSON results to this path")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.budget_scale)
+    for name, result in results.items():
+        print(f"{name:<16}import {result['import_ms']:7.1f} ms / {result['budget_ms']:.0f} ms"
+              f"   wall {result['wall_ms']:7.1f} ms   {result['module_count']} modules"
+              f"{'   OVER BUDGET' if result['over_budget'] else ''}"
+              f"{'   imports ' + ', '.join(result['forbidden']) if result['forbidden'] else ''}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    failed = any(result['over_budget'] or result['forbidden'] or result['returncode'] for result in results.values())
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
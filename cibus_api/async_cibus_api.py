@@ -0,0 +1,304 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+from cibus_api.common.constants.api_call_type import CART_CHANGING_CALL_TYPES, UNSHARED_CALL_TYPES
+from cibus_api.common.constants.api_config import ApiConfig
+from cibus_api.common.retry_policy import RetryPolicy
+from cibus_api.instrumentation import CallRecord
+from cibus_api.common.request_builders import (
+    build_add_to_cart_payload, build_apply_order_payload, build_cart_info_payload, build_order_history_payload,
+    split_date_range
+)
+from cibus_api.common.cibus_objects.cibus_cart import ApplyOrderResponse, CartInfo
+from cibus_api.common.cibus_objects.cibus_order_history import OrderHistoryResponse
+from cibus_api.common.cibus_objects.order_history_stream import OrderHistoryStream
+from common.end_points import ApiEndpoints
+
+
+class AsyncCibusApi:
+    """
+    asyncio counterpart of CibusApi.
+
+    Pass the same `semaphore` to every client of an account fleet to bound the
+    number of in-flight requests across the whole event loop.
+    """
+    def __init__(self, token, max_concurrency=ApiConfig.POOL_SIZE, semaphore=None, session=None,
+                 retry_policy=None, timeout=ApiConfig.REQUEST_TIMEOUT, data_url=None,
+                 instrumentation=None, single_flight=None):
+        self.default_headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'X-App-Id': ApiConfig.APP_ID,
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        self.cookies = {"token": token}
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_concurrency = max_concurrency
+        self.data_url = data_url if data_url is not None else ApiEndpoints.DATA
+        self.instrumentation = instrumentation  # an Instrumentation that every call is recorded to
+        # An AsyncSingleFlight, possibly shared between clients, to coalesce identical concurrent calls
+        self.single_flight = single_flight
+        # Part of single-flight keys, replaced on every cart change by a marker no other client has
+        self.__cart_generation = None
+        # The cart as last returned by or derived from cart calls, None when unknown
+        self.cart = None
+        self.semaphore = semaphore if semaphore is not None else asyncio.Semaphore(max_concurrency)
+        # A shared session should be created with a DummyCookieJar, so tokens
+        # returned in Set-Cookie don't leak between accounts.
+        self.session = session
+        self.__owns_session = session is None
+
+    async def __aenter__(self):
+        self.__get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __get_session(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+                cookie_jar=aiohttp.DummyCookieJar(),
+                timeout=self.timeout,
+            )
+        return self.session
+
+    async def close(self):
+        """Close the session if this client created it."""
+        if self.__owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def warm_up(self, connections=1, url=None):
+        """Open `connections` keep-alive connections ahead of time. Returns the number opened."""
+        url = url if url is not None else self.data_url
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        session = self.__get_session()
+
+        async def _open_connection():
+            try:
+                async with self.semaphore:
+                    async with session.head(origin, headers=self.default_headers) as response:
+                        await response.read()
+                return True
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return False
+
+        results = await asyncio.gather(*(_open_connection() for _ in range(max(1, connections))))
+        return sum(results)
+
+    async def __post_request(self, url, data=None, headers=None, cookies=None, record=None):
+        # Use default values if not provided
+        headers = headers if headers is not None else self.default_headers
+        cookies = cookies if cookies is not None else self.cookies
+        record = record if record is not None else CallRecord(call_type=None, url=url)
+        body = json.dumps(data).encode('utf-8')
+        headers = {**headers, 'Content-Type': 'application/json'}
+        record.request_bytes = len(body)
+
+        call_type = data.get("type") if isinstance(data, dict) else None
+        retryable = self.retry_policy.is_retryable(call_type)
+        session = self.__get_session()
+        attempt = 0
+
+        while True:
+            try:
+                async with self.semaphore:
+                    async with session.post(url, data=body, headers=headers, cookies=cookies) as response:
+                        record.status = response.status
+                        response.raise_for_status()
+                        content = await response.read()
+                record.response_bytes = len(content)
+                return content
+
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientResponseError) as e:
+                status_code = e.status if isinstance(e, aiohttp.ClientResponseError) else None
+                record.status = status_code
+                can_retry = retryable and attempt < self.retry_policy.max_retries and (
+                    status_code is None or status_code in self.retry_policy.retry_on_status
+                )
+                if can_retry:
+                    attempt += 1
+                    record.retries = attempt
+                    await asyncio.sleep(self.retry_policy.get_backoff(attempt))
+                    continue
+                if isinstance(e, asyncio.TimeoutError):
+                    raise aiohttp.ClientError(f"Request to {url} timed out")
+                if isinstance(e, aiohttp.ClientResponseError):
+                    # The status is kept so callers can tell a rejected token from a failing API
+                    raise aiohttp.ClientResponseError(e.request_info, e.history, status=e.status, headers=e.headers,
+                                                      message=f"POST request to {url} failed: {str(e)}")
+                raise aiohttp.ClientError(f"POST request to {url} failed: {str(e)}")
+            except aiohttp.ClientError as e:
+                raise aiohttp.ClientError(f"POST request to {url} failed: {str(e)}")
+
+    async def __call(self, data, parse=None):
+        """
+        POST a DATA call and return its decoded JSON, passed through `parse` if given.
+        With a single_flight, identical concurrent idempotent calls of the same token share one request and result,
+        except cart calls, since the cart changes between them. Calls made after a cart change don't share
+        results with calls made before it.
+        """
+        call_type = data.get("type")
+        if call_type in CART_CHANGING_CALL_TYPES:
+            try:
+                return await self.__fetch(data, parse)
+            finally:
+                self.__on_cart_changed()  # even on failure, since the order may have gone through
+        if (self.single_flight is None or call_type in UNSHARED_CALL_TYPES
+                or call_type not in self.retry_policy.idempotent_call_types):
+            return await self.__fetch(data, parse)
+        key = (self.cookies["token"], self.__cart_generation, call_type, json.dumps(data, sort_keys=True), parse)
+        return await self.single_flight.do(key, lambda: self.__fetch(data, parse))
+
+    def __on_cart_changed(self):
+        """Keep later calls from joining in-flight calls or reusing cached results from before a cart change."""
+        self.__cart_generation = object()
+        if self.single_flight is not None:
+            self.single_flight.invalidate()
+
+    async def __fetch(self, data, parse=None):
+        """Make a DATA call, recording it to the instrumentation with parsing timed apart from the network."""
+        record = CallRecord(call_type=data.get("type"), url=self.data_url)
+        start = time.perf_counter()
+        try:
+            content = await self.__post_request(url=self.data_url, data=data, record=record)
+            record.network_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = json.loads(content)
+            record.decode_time = time.perf_counter() - start
+            if parse is not None:
+                start = time.perf_counter()
+                result = parse(result)
+                record.parse_time = time.perf_counter() - start
+            return result
+        except Exception as e:
+            if not record.network_time:
+                record.network_time = time.perf_counter() - start
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.record(record)
+
+    async def get_order_history_in_time_range(self, from_date, to_date):
+        # Prepare the request data
+        data = build_order_history_payload(from_date, to_date)
+
+        # Send the request and create the typed response object
+        return await self.__call(data, parse=OrderHistoryResponse.from_dict)
+
+    async def stream_order_history_in_time_range(self, from_date, to_date, chunk_size=64 * 1024):
+        """
+        Like get_order_history_in_time_range, but returns an OrderHistoryStream to be
+        consumed with `async for`, yielding OrderHistoryItems as the body arrives.
+        Streams aren't retried, since items may already have been handed out.
+        """
+        data = build_order_history_payload(from_date, to_date)
+        session = self.__get_session()
+        record = CallRecord(call_type=data["type"], url=self.data_url)
+        start = time.perf_counter()
+        response = None
+        try:
+            async with self.semaphore:
+                response = await session.post(self.data_url, json=data, headers=self.default_headers,
+                                              cookies=self.cookies)
+            record.status = response.status
+            response.raise_for_status()
+        except aiohttp.ClientResponseError as e:
+            if response is not None:
+                response.release()
+            record.error = f"{type(e).__name__}: {e}"
+            raise aiohttp.ClientError(f"POST request to {self.data_url} failed: {str(e)}")
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise aiohttp.ClientError(f"POST request to {self.data_url} failed: {str(e)}")
+        finally:
+            # Only the time to the response headers, the body is read by the caller
+            record.network_time = time.perf_counter() - start
+            if self.instrumentation is not None:
+                self.instrumentation.record(record)
+        return OrderHistoryStream(response.content.iter_chunked(chunk_size), close=response.release)
+
+    async def get_order_history_in_chunks(self, from_date, to_date, window=30, max_concurrency=4):
+        """
+        Fetch a long date range as concurrent `window`-sized requests (days, "week" or "month")
+        and merge them into a single OrderHistoryResponse, deduplicated by deal_id.
+        """
+        windows = split_date_range(from_date, to_date, window)
+        window_semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _fetch_window(date_window):
+            async with window_semaphore:
+                return await self.get_order_history_in_time_range(*date_window)
+
+        responses = await asyncio.gather(*(_fetch_window(date_window) for date_window in windows))
+        return OrderHistoryResponse.merge(list(responses))
+
+    async def is_token_valid(self):
+        """
+        Probe the API with a cheap call to check that the session token is still accepted.
+        Raises aiohttp.ClientError when the API can't answer, so a timeout or server error
+        isn't mistaken for a rejected token.
+        """
+        try:
+            today = datetime.now()
+            return (await self.get_order_history_in_time_range(from_date=today, to_date=today)).is_success
+        except aiohttp.ClientResponseError as e:
+            if e.status in ApiConfig.AUTH_FAILURE_STATUSES:
+                return False
+            raise
+
+    async def get_cart_info(self, use_cached=False):
+        """Get the cart, or with `use_cached` the locally tracked cart when it's known, saving a round trip."""
+        if use_cached and self.cart is not None:
+            return self.cart
+        self.cart = await self.__call(build_cart_info_payload(), parse=CartInfo.from_dict)
+        return self.cart
+
+    async def add_product_to_cart(self, restaurant_id, dishes):
+        """
+        Add every dish in a single ADD_TO_CART call and return the resulting cart. When
+        the response doesn't include the cart, it's derived from the locally tracked one.
+        """
+        dishes = list(dishes)
+        previous = self.cart
+        # Only a cart from the response, or derived from a known one, can be tracked
+        is_known = previous is not None
+
+        def _parse(response_json):
+            nonlocal is_known
+            if "dish_list" in response_json:
+                is_known = True
+                return CartInfo.from_dict(response_json)
+            cart = (previous if previous is not None else CartInfo.empty()).with_dishes(restaurant_id, dishes)
+            cart.code = response_json.get("code", 0)
+            cart.msg = response_json.get("msg", "")
+            cart.http_code = response_json.get("http_code", 200)
+            return cart
+
+        self.cart = None  # unknown until the call succeeds
+        cart = await self.__call(build_add_to_cart_payload(restaurant_id, dishes), parse=_parse)
+        if cart.is_success and is_known:
+            self.cart = cart
+        return cart
+
+    async def get_restaurant_items(self):
+        ...
+
+    async def apply_cart_order(self):
+        """Place the cart as an order."""
+        budget = self.cart.budget if self.cart is not None else None
+        self.cart = None  # unknown until the call succeeds
+        response = await self.__call(build_apply_order_payload(), parse=ApplyOrderResponse.from_dict)
+        if response.is_success:
+            self.cart = CartInfo.empty(budget)
+        return response
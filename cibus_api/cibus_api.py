@@ -1,11 +1,29 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
 import requests
-from requests.exceptions import RequestException, Timeout
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, Timeout, HTTPError, ConnectionError as RequestsConnectionError
+from cibus_api.common.constants.api_call_type import CART_CHANGING_CALL_TYPES, UNSHARED_CALL_TYPES
 from cibus_api.common.constants.api_config import ApiConfig
+from cibus_api.instrumentation import CallRecord
+from cibus_api.common.retry_policy import RetryPolicy
+from cibus_api.common.request_builders import (
+    build_add_to_cart_payload, build_apply_order_payload, build_cart_info_payload, build_order_history_payload,
+    split_date_range
+)
+from cibus_api.common.cibus_objects.cibus_cart import ApplyOrderResponse, CartInfo
+from cibus_api.common.cibus_objects.cibus_order_history import OrderHistoryResponse
+from cibus_api.common.cibus_objects.order_history_stream import OrderHistoryStream
+from common.end_points import ApiEndpoints
 
-#todo: rewrite into simpler code
 
 class CibusApi:
-    def __init__(self, token):
+    def __init__(self, token, pool_size=ApiConfig.POOL_SIZE, retry_policy=None, timeout=ApiConfig.REQUEST_TIMEOUT,
+                 data_url=None, instrumentation=None, single_flight=None):
         self.default_headers = {
             'Content-Type': 'application/json',
             'Accept': 'application/json',
@@ -13,52 +31,180 @@ class CibusApi:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         self.cookies = {"token": token}  # Will be populated after login
-        
-    def __post_request(self, url, data=None, headers=None, cookies=None):
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.data_url = data_url if data_url is not None else ApiEndpoints.DATA
+        self.instrumentation = instrumentation  # an Instrumentation that every call is recorded to
+        # A SingleFlight, possibly shared between clients, to coalesce identical concurrent calls
+        self.single_flight = single_flight
+        # Part of single-flight keys, replaced on every cart change by a marker no other client has
+        self.__cart_generation = None
+        # The cart as last returned by or derived from cart calls, None when unknown
+        self.cart = None
+        self.session = self.__create_session(pool_size)
+
+    def __create_session(self, pool_size):
+        # One keep-alive pool per host, so repeated calls skip the TCP+TLS handshake.
+        # Retries are handled per call type in __post_request, not by urllib3.
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Close the session and every pooled connection."""
+        self.session.close()
+
+    def warm_up(self, connections=1, url=None):
+        """
+        Open `connections` keep-alive connections ahead of time, so the first
+        real calls don't pay for the handshake. Returns the number of connections opened.
+        """
+        url = url if url is not None else self.data_url
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        connections = max(1, min(connections, self.pool_size))
+
+        def _open_connection(_):
+            try:
+                self.session.head(origin, headers=self.default_headers, timeout=self.timeout)
+                return True
+            except RequestException:
+                return False
+
+        # Concurrent requests force the pool to open separate connections
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(_open_connection, range(connections)))
+
+    def __post_request(self, url, data=None, headers=None, cookies=None, stream=False, record=None):
+        # Use default values if not provided
+        headers = headers if headers is not None else self.default_headers
+        cookies = cookies if cookies is not None else self.cookies
+        record = record if record is not None else CallRecord(call_type=None, url=url)
+
+        call_type = data.get("type") if isinstance(data, dict) else None
+        retryable = self.retry_policy.is_retryable(call_type)
+        attempt = 0
+
+        while True:
+            try:
+                # Send the request
+                response = self.session.post(
+                    url=url,
+                    json=data,  # Automatically converts to JSON
+                    headers=headers,
+                    cookies=cookies,
+                    timeout=self.timeout,
+                    stream=stream
+                )
+                record.status = response.status_code
+                record.request_bytes = len(response.request.body or b'')
+
+                # Raise an exception if the request failed
+                response.raise_for_status()
+
+                return response
+
+            except (Timeout, RequestsConnectionError, HTTPError) as e:
+                status_code = e.response.status_code if isinstance(e, HTTPError) and e.response is not None else None
+                record.status = status_code
+                can_retry = retryable and attempt < self.retry_policy.max_retries and (
+                    status_code is None or status_code in self.retry_policy.retry_on_status
+                )
+                if can_retry:
+                    attempt += 1
+                    record.retries = attempt
+                    time.sleep(self.retry_policy.get_backoff(attempt))
+                    continue
+                if isinstance(e, Timeout):
+                    # Handle timeout specifically
+                    raise RequestException(f"Request to {url} timed out")
+                # The response is kept so callers can tell a rejected token from a failing API
+                raise RequestException(f"POST request to {url} failed: {str(e)}",
+                                       response=e.response if isinstance(e, HTTPError) else None)
+            except RequestException as e:
+                # Re-raise the exception with more context
+                raise RequestException(f"POST request to {url} failed: {str(e)}")
+
+    def __call(self, data, parse=None):
+        """
+        POST a DATA call and return its decoded JSON, passed through `parse` if given.
+        With a single_flight, identical concurrent idempotent calls of the same token share one request and result,
+        except cart calls, since the cart changes between them. Calls made after a cart change don't share
+        results with calls made before it.
+        """
+        call_type = data.get("type")
+        if call_type in CART_CHANGING_CALL_TYPES:
+            try:
+                return self.__fetch(data, parse)
+            finally:
+                self.__on_cart_changed()  # even on failure, since the order may have gone through
+        if (self.single_flight is None or call_type in UNSHARED_CALL_TYPES
+                or call_type not in self.retry_policy.idempotent_call_types):
+            return self.__fetch(data, parse)
+        key = (self.cookies["token"], self.__cart_generation, call_type, json.dumps(data, sort_keys=True), parse)
+        return self.single_flight.do(key, lambda: self.__fetch(data, parse))
+
+    def __on_cart_changed(self):
+        """Keep later calls from joining in-flight calls or reusing cached results from before a cart change."""
+        self.__cart_generation = object()
+        if self.single_flight is not None:
+            self.single_flight.invalidate()
+
+    def __fetch(self, data, parse=None):
+        """Make a DATA call, recording it to the instrumentation with parsing timed apart from the network."""
+        record = CallRecord(call_type=data.get("type"), url=self.data_url)
+        start = time.perf_counter()
         try:
-            # Use default values if not provided
-            headers = headers if headers is not None else self.default_headers
-            cookies = cookies if cookies is not None else self.cookies
-            
-            # Send the request
-            response = requests.post(
-                url=url,
-                json=data,  # Automatically converts to JSON
-                headers=headers,
-                cookies=cookies,
-                timeout=30  # Timeout after 30 seconds
-            )
-            
-            # Raise an exception if the request failed
-            response.raise_for_status()
-            
-            return response
-            
-        except Timeout:
-            # Handle timeout specifically
-            raise RequestException(f"Request to {url} timed out")
-        except RequestException as e:
-            # Re-raise the exception with more context
-            raise RequestException(f"POST request to {url} failed: {str(e)}")
-    
+            response = self.__post_request(url=self.data_url, data=data, record=record)
+            body = response.content
+            record.response_bytes = len(body)
+            record.network_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = response.json()
+            record.decode_time = time.perf_counter() - start
+            if parse is not None:
+                start = time.perf_counter()
+                result = parse(result)
+                record.parse_time = time.perf_counter() - start
+            return result
+        except Exception as e:
+            if not record.network_time:
+                record.network_time = time.perf_counter() - start
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.record(record)
+
     def __get_request(self, url, headers=None, cookies=None):
         try:
             # Use default values if not provided
             headers = headers if headers is not None else self.default_headers
             cookies = cookies if cookies is not None else self.cookies
-              # Send the request
-            response = requests.get(
+            # Send the request
+            response = self.session.get(
                 url=url,
                 headers=headers,
                 cookies=cookies,
-                timeout=30  # Timeout after 30 seconds
+                timeout=self.timeout
             )
-            
+
             # Raise an exception if the request failed
             response.raise_for_status()
-            
+
             return response
-            
+
         except Timeout:
             # Handle timeout specifically
             raise RequestException(f"Request to {url} timed out")
@@ -67,51 +213,107 @@ class CibusApi:
             raise RequestException(f"GET request to {url} failed: {str(e)}")
 
     def get_order_history_in_time_range(self, from_date, to_date):
-        from datetime import datetime
-        from common.end_points import ApiEndpoints
-        from .common.constants.api_call_type import ApiCallType
-        from .common.cibus_objects.cibus_order_history import OrderHistoryResponse
-        
-        # Convert datetime objects to string format if needed
-        if isinstance(from_date, datetime):
-            from_date = from_date.strftime('%d/%m/%Y')
-        if isinstance(to_date, datetime):
-            to_date = to_date.strftime('%d/%m/%Y')
-            
-        # Validate date formats
-        try:
-            datetime.strptime(from_date, '%d/%m/%Y')
-            datetime.strptime(to_date, '%d/%m/%Y')
-        except ValueError:
-            raise ValueError("Dates must be in 'DD/MM/YYYY' format")
-        
         # Prepare the request data
-        data = {
-            "from_date": from_date,
-            "to_date": to_date,
-            "type": ApiCallType.ORDER_HISTORY.value
-        }
-        
-        # Send the request
-        response = self.__post_request(
-            url=ApiEndpoints.DATA,
-            data=data
-        )
-        
-        # Parse the response
-        response_json = response.json()
-        
-        # Create and return the typed response object
-        return OrderHistoryResponse.from_dict(response_json)
-
-    def get_cart_info(self):
-        ...
+        data = build_order_history_payload(from_date, to_date)
 
-    def add_product_to_cart(self):
-        ...
+        # Send the request and create the typed response object
+        return self.__call(data, parse=OrderHistoryResponse.from_dict)
+
+    def stream_order_history_in_time_range(self, from_date, to_date, chunk_size=64 * 1024):
+        """
+        Like get_order_history_in_time_range, but returns an OrderHistoryStream that
+        reads the body incrementally and yields OrderHistoryItems one at a time.
+        """
+        data = build_order_history_payload(from_date, to_date)
+        record = CallRecord(call_type=data["type"], url=self.data_url)
+        start = time.perf_counter()
+        try:
+            response = self.__post_request(
+                url=self.data_url,
+                data=data,
+                stream=True,
+                record=record
+            )
+        except RequestException as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            # Only the time to the response headers, the body is read by the caller
+            record.network_time = time.perf_counter() - start
+            if self.instrumentation is not None:
+                self.instrumentation.record(record)
+        return OrderHistoryStream(response.iter_content(chunk_size=chunk_size), close=response.close)
+
+    def get_order_history_in_chunks(self, from_date, to_date, window=30, max_workers=4):
+        """
+        Fetch a long date range as concurrent `window`-sized requests (days, "week" or "month")
+        and merge them into a single OrderHistoryResponse, deduplicated by deal_id.
+        """
+        windows = split_date_range(from_date, to_date, window)
+        max_workers = max(1, min(max_workers, len(windows), self.pool_size))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(
+                lambda date_window: self.get_order_history_in_time_range(*date_window),
+                windows
+            ))
+        return OrderHistoryResponse.merge(responses)
+
+    def is_token_valid(self):
+        """
+        Probe the API with a cheap call to check that the session token is still accepted.
+        Raises RequestException when the API can't answer, so a timeout or server error
+        isn't mistaken for a rejected token.
+        """
+        try:
+            today = datetime.now()
+            return self.get_order_history_in_time_range(from_date=today, to_date=today).is_success
+        except RequestException as e:
+            if e.response is not None and e.response.status_code in ApiConfig.AUTH_FAILURE_STATUSES:
+                return False
+            raise
+
+    def get_cart_info(self, use_cached=False):
+        """Get the cart, or with `use_cached` the locally tracked cart when it's known, saving a round trip."""
+        if use_cached and self.cart is not None:
+            return self.cart
+        self.cart = self.__call(build_cart_info_payload(), parse=CartInfo.from_dict)
+        return self.cart
+
+    def add_product_to_cart(self, restaurant_id, dishes):
+        """
+        Add every dish in a single ADD_TO_CART call and return the resulting cart. When
+        the response doesn't include the cart, it's derived from the locally tracked one.
+        """
+        dishes = list(dishes)
+        previous = self.cart
+        # Only a cart from the response, or derived from a known one, can be tracked
+        is_known = previous is not None
+
+        def _parse(response_json):
+            nonlocal is_known
+            if "dish_list" in response_json:
+                is_known = True
+                return CartInfo.from_dict(response_json)
+            cart = (previous if previous is not None else CartInfo.empty()).with_dishes(restaurant_id, dishes)
+            cart.code = response_json.get("code", 0)
+            cart.msg = response_json.get("msg", "")
+            cart.http_code = response_json.get("http_code", 200)
+            return cart
+
+        self.cart = None  # unknown until the call succeeds
+        cart = self.__call(build_add_to_cart_payload(restaurant_id, dishes), parse=_parse)
+        if cart.is_success and is_known:
+            self.cart = cart
+        return cart
 
     def get_restaurant_items(self):
         ...
 
     def apply_cart_order(self):
-        ...
\ No newline at end of file
+        """Place the cart as an order."""
+        budget = self.cart.budget if self.cart is not None else None
+        self.cart = None  # unknown until the call succeeds
+        response = self.__call(build_apply_order_payload(), parse=ApplyOrderResponse.from_dict)
+        if response.is_success:
+            self.cart = CartInfo.empty(budget)
+        return response
@@ -1,12 +1,36 @@
 """
 Cibus API object classes for working with Cibus API data.
+
+Classes are imported from their modules on first access, so importing one module
+of this package (e.g. the cart) doesn't also import the menu and order classes.
 """
-from .cibus_dish import CibusDish
-from .cibus_orders import PreviousOrdersResponse, Order, RequestedObject, Logo
-from .cibus_menu import RestaurantMenuResponse, MenuCategory, MenuItem, MenuElement
+import importlib
+
+_EXPORTS = {
+    'CibusDish': 'cibus_dish',
+    'CartInfo': 'cibus_cart', 'ApplyOrderResponse': 'cibus_cart',
+    'PreviousOrdersResponse': 'cibus_orders', 'Order': 'cibus_orders', 'RequestedObject': 'cibus_orders',
+    'Logo': 'cibus_orders',
+    'RestaurantMenuResponse': 'cibus_menu', 'MenuCategory': 'cibus_menu', 'MenuItem': 'cibus_menu',
+    'MenuElement': 'cibus_menu'
+}
 
 __all__ = [
-    'CibusDish', 
+    'CibusDish',
+    'CartInfo', 'ApplyOrderResponse',
     'PreviousOrdersResponse', 'Order', 'RequestedObject', 'Logo',
     'RestaurantMenuResponse', 'MenuCategory', 'MenuItem', 'MenuElement'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value  # later accesses don't go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,87 @@
+"""
+Classes for representing Cibus cart and order placement data from the API.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, ClassVar, Iterable
+
+from .cibus_dish import CibusDish
+from .schema import codec, schema_field
+
+
+@codec
+@dataclass(slots=True)
+class CartInfo:
+    """Represents the cart, as returned by the cart information and add to cart API calls."""
+    restaurant_id: Optional[int]
+    dish_list: List[CibusDish]
+    total_price: float = schema_field(coerce=float)
+    budget: Optional[float]
+    code: int
+    msg: str
+    http_code: int
+
+    # Class constants
+    API_CALL_TYPE: ClassVar[str] = "prx_get_cart"
+
+    @classmethod
+    def empty(cls, budget: Optional[float] = None) -> 'CartInfo':
+        """Create an empty cart."""
+        return cls(restaurant_id=None, dish_list=[], total_price=0.0, budget=budget, code=0, msg='', http_code=200)
+
+    @property
+    def is_success(self) -> bool:
+        """Check if the response indicates success."""
+        return self.code == 0 and self.http_code == 200
+
+    @property
+    def is_empty(self) -> bool:
+        """Check if the cart has no dishes."""
+        return not self.dish_list
+
+    def get_remaining_budget(self) -> Optional[float]:
+        """Get the budget left after the cart's dishes, or None if the budget is unknown."""
+        if self.budget is None:
+            return None
+        return self.budget - self.total_price
+
+    def get_dish_counts(self) -> Counter:
+        """Get how many of each dish_id the cart holds."""
+        return Counter(dish.dish_id for dish in self.dish_list)
+
+    def with_dishes(self, restaurant_id: int, dishes: Iterable[CibusDish]) -> 'CartInfo':
+        """
+        Get the cart expected after adding dishes of a restaurant. A cart only holds
+        dishes of a single restaurant, so adding from another one starts a new cart.
+        """
+        dish_list = list(self.dish_list) if self.restaurant_id in (None, restaurant_id) else []
+        dish_list.extend(dishes)
+        return CartInfo(
+            restaurant_id=restaurant_id,
+            dish_list=dish_list,
+            total_price=sum(dish.dish_price for dish in dish_list),
+            budget=self.budget,
+            code=self.code,
+            msg=self.msg,
+            http_code=self.http_code
+        )
+
+
+@codec
+@dataclass(slots=True)
+class ApplyOrderResponse:
+    """Represents the response of placing the cart as an order."""
+    deal_id: Optional[int]
+    voucher_code: Optional[str]
+    total_price: float = schema_field(coerce=float)
+    code: int
+    msg: str
+    http_code: int
+
+    # Class constants
+    API_CALL_TYPE: ClassVar[str] = "prx_apply_order"
+
+    @property
+    def is_success(self) -> bool:
+        """Check if the response indicates success."""
+        return self.code == 0 and self.http_code == 200
@@ -1,7 +1,10 @@
 from dataclasses import dataclass
 
-@dataclass
+from .schema import codec, schema_field
+
+@codec
+@dataclass(slots=True)
 class CibusDish:
     dish_id: int
     dish_category: int
-    dish_price: float
\ No newline at end of file
+    dish_price: float = schema_field(coerce=float)
@@ -1,13 +1,81 @@
 """
 Classes for representing Cibus restaurant menu data from the API.
 """
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableSequence
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, ClassVar, Union
+from functools import partial
+from typing import Callable, Dict, List, Optional, Any, ClassVar, Tuple, Union
 
+from .schema import codec, schema_field
 
-@dataclass
+
+class LazyElementList(MutableSequence):
+    """
+    List of menu elements that keeps the raw API dicts and only parses an element
+    the first time it is accessed. Behaves like a regular list otherwise.
+    """
+
+    def __init__(self, raw_elements: List[Dict[str, Any]], parse: Callable[[Dict[str, Any]], Any]):
+        self._raw = list(raw_elements)
+        self._parsed = [None] * len(self._raw)
+        self._parse = parse
+
+    def __len__(self) -> int:
+        return len(self._parsed)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        element = self._parsed[index]
+        if element is None:
+            element = self._parse(self._raw[index])
+            self._parsed[index] = element
+            self._raw[index] = None  # the parsed element replaces the raw dict
+        return element
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            values = list(value)
+            self._parsed[index] = values
+            self._raw[index] = [None] * len(values)
+        else:
+            self._parsed[index] = value
+            self._raw[index] = None
+
+    def __delitem__(self, index):
+        del self._parsed[index]
+        del self._raw[index]
+
+    def insert(self, index, value):
+        self._parsed.insert(index, value)
+        self._raw.insert(index, None)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, LazyElementList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def get_raw(self, index: int) -> Optional[Dict[str, Any]]:
+        """Get the raw dict of an element that hasn't been parsed yet, or None."""
+        return self._raw[index]
+
+    def get_parsed(self) -> List[Any]:
+        """Get the elements parsed so far, with None in place of the others."""
+        return list(self._parsed)
+
+    def is_parsed(self, index: int) -> bool:
+        """Check if the element at `index` has been parsed."""
+        return self._parsed[index] is not None
+
+
+@codec
+@dataclass(slots=True)
 class MenuElement:
-    """Base class for menu elements (categories and items)."""
+    """Base class for menu elements (categories and items). from_dict/to_dict are generated by @codec."""
     name: str
     price: int
     order: int
@@ -29,57 +97,6 @@ class MenuElement:
     child_count: int
     has_freebies: bool
 
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'MenuElement':
-        """Create a MenuElement instance from a dictionary."""
-        return cls(
-            name=data.get('name', ''),
-            price=data.get('price', 0),
-            order=data.get('order', 0),
-            is_mandatory=data.get('is_mandatory', 0),
-            img=data.get('img', ''),
-            max_items=data.get('max_items', 0),
-            free_items=data.get('free_items', 0),
-            caloric_value=data.get('caloric_value'),
-            gluten_free=data.get('gluten_free', 0),
-            vegan=data.get('vegan'),
-            vegetarian=data.get('vegetarian'),
-            spice_level_name=data.get('spice_level_name'),
-            elm_hash=data.get('elm_hash', 0),
-            elm_desc_hash=data.get('elm_desc_hash'),
-            element_id=data.get('element_id', 0),
-            element_type=data.get('element_type', 0),
-            min_items=data.get('min_items', 0),
-            description=data.get('description', ''),
-            child_count=data.get('child_count', 0),
-            has_freebies=data.get('has_freebies', False),
-        )
-
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert the MenuElement instance to a dictionary."""
-        return {
-            'name': self.name,
-            'price': self.price,
-            'order': self.order,
-            'is_mandatory': self.is_mandatory,
-            'img': self.img,
-            'max_items': self.max_items,
-            'free_items': self.free_items,
-            'caloric_value': self.caloric_value,
-            'gluten_free': self.gluten_free,
-            'vegan': self.vegan,
-            'vegetarian': self.vegetarian,
-            'spice_level_name': self.spice_level_name,
-            'elm_hash': self.elm_hash,
-            'elm_desc_hash': self.elm_desc_hash,
-            'element_id': self.element_id,
-            'element_type': self.element_type,
-            'min_items': self.min_items,
-            'description': self.description,
-            'child_count': self.child_count,
-            'has_freebies': self.has_freebies,
-        }
-
     @property
     def is_category(self) -> bool:
         """Check if this element is a category."""
@@ -91,52 +108,34 @@ class MenuElement:
         return self.element_type == 13
 
 
-@dataclass
+@codec
+@dataclass(slots=True)
 class MenuItem(MenuElement):
     """Represents a menu item (element_type=13)."""
-    
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'MenuItem':
-        """Create a MenuItem instance from a dictionary."""
-        return super().from_dict(data)
 
 
-@dataclass
+@codec
+@dataclass(slots=True)
 class MenuCategory(MenuElement):
     """Represents a menu category (element_type=12) containing items."""
-    items: Dict[int, List[MenuItem]] = field(default_factory=dict)
+    items: Dict[int, List[MenuItem]] = schema_field(skip=True, default_factory=dict)
     
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'MenuCategory':
-        """Create a MenuCategory instance from a dictionary."""
-        category = cls(**{
-            'name': data.get('name', ''),
-            'price': data.get('price', 0),
-            'order': data.get('order', 0),
-            'is_mandatory': data.get('is_mandatory', 0),
-            'img': data.get('img', ''),
-            'max_items': data.get('max_items', 0),
-            'free_items': data.get('free_items', 0),
-            'caloric_value': data.get('caloric_value'),
-            'gluten_free': data.get('gluten_free', 0),
-            'vegan': data.get('vegan'),
-            'vegetarian': data.get('vegetarian'),
-            'spice_level_name': data.get('spice_level_name'),
-            'elm_hash': data.get('elm_hash', 0),
-            'elm_desc_hash': data.get('elm_desc_hash'),
-            'element_id': data.get('element_id', 0),
-            'element_type': data.get('element_type', 0),
-            'min_items': data.get('min_items', 0),
-            'description': data.get('description', ''),
-            'child_count': data.get('child_count', 0),
-            'has_freebies': data.get('has_freebies', False),
-        })
+    def from_dict(cls, data: Dict[str, Any], lazy: bool = False) -> 'MenuCategory':
+        """
+        Create a MenuCategory instance from a dictionary.
+        With `lazy`, child items are only parsed when first accessed.
+        """
+        category = cls._decode_fields(data)
         
         # Process child items
         for element_type, items_data in data.items():
             if isinstance(element_type, str) and element_type.isdigit():
                 type_id = int(element_type)
                 if type_id != category.element_type:  # Skip the self-reference
+                    if lazy:
+                        category.items[type_id] = LazyElementList(items_data, MenuItem.from_dict)
+                        continue
                     category.items[type_id] = []
                     for item_data in items_data:
                         category.items[type_id].append(MenuItem.from_dict(item_data))
@@ -145,7 +144,7 @@ class MenuCategory(MenuElement):
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the MenuCategory instance to a dictionary."""
-        result = super().to_dict()
+        result = self._encode_fields()
         
         # Add child items
         for element_type, items in self.items.items():
@@ -164,42 +163,172 @@ class MenuCategory(MenuElement):
         return all_items
 
 
-@dataclass
+def _get_structure(categories: Dict[int, List[MenuCategory]]) -> list:
+    """
+    Get the length of every category list and of the item lists of every parsed category,
+    to tell when categories or items were added or removed.
+    """
+    structure = []
+    for category_list in categories.values():
+        structure += (id(category_list), len(category_list))
+        if isinstance(category_list, LazyElementList):
+            category_list = [category for category in category_list.get_parsed() if category is not None]
+        structure += [len(items) for category in category_list for items in category.items.values()]
+    return structure
+
+
+def _get_element_ids(elements: List[MenuElement]) -> List[int]:
+    """Get the element_id of every element of a list, without parsing a lazy one."""
+    if not isinstance(elements, LazyElementList):
+        return [element.element_id for element in elements]
+    element_ids = []
+    for position, element in enumerate(elements.get_parsed()):
+        element_ids.append(element.element_id if element is not None else elements.get_raw(position)['element_id'])
+    return element_ids
+
+
+class MenuIndex:
+    """
+    Lookup tables over the categories and items of a menu. The positions of categories and items
+    are read from the raw dicts of a lazy menu, so finding one only parses its category and itself.
+    The price and dietary tables need every item parsed, so they are built on first use.
+    """
+
+    DIETARY_FLAGS: ClassVar[tuple] = ('vegan', 'vegetarian', 'gluten_free')
+
+    def __init__(self, categories: Dict[int, List[MenuCategory]]):
+        self.source = categories  # used to detect a replaced categories dict
+        # element_id -> (element_type, position) of every category with it
+        self.category_positions: Dict[int, List[Tuple[int, int]]] = {}
+        # element_id -> (category element_type, category position, element_type, position) of the first item with it
+        self.item_positions: Dict[int, Tuple[int, int, int, int]] = {}
+        self.__items: Optional[List[MenuItem]] = None
+        self.__items_by_flag: Optional[Dict[str, List[MenuItem]]] = None
+        self.__items_by_price: Optional[List[MenuItem]] = None
+        self.__prices: Optional[List[int]] = None
+
+        for element_type, category_list in categories.items():
+            for position in range(len(category_list)):
+                raw_category = category_list.get_raw(position) if isinstance(category_list, LazyElementList) else None
+                if raw_category is None:
+                    category = category_list[position]
+                    category_id = category.element_id
+                    item_ids = {item_type: _get_element_ids(items) for item_type, items in category.items.items()}
+                else:
+                    category_id = raw_category['element_id']
+                    item_ids = {int(key): [raw_item['element_id'] for raw_item in items_data]
+                                for key, items_data in raw_category.items()
+                                if key.isdigit() and int(key) != raw_category['element_type']}
+
+                self.category_positions.setdefault(category_id, []).append((element_type, position))
+                for item_type, element_ids in item_ids.items():
+                    for item_position, element_id in enumerate(element_ids):
+                        # setdefault keeps the first match, like the linear scans did
+                        self.item_positions.setdefault(element_id, (element_type, position, item_type, item_position))
+
+        self.structure = _get_structure(categories)  # used to detect added or removed categories and items
+
+    def __get_category(self, element_type: int, position: int) -> Optional[MenuCategory]:
+        category_list = self.source.get(element_type)
+        if category_list is None or position >= len(category_list):
+            return None  # removed since the index was built
+        if not isinstance(category_list, LazyElementList) or category_list.is_parsed(position):
+            return category_list[position]
+        is_current = self.structure == _get_structure(self.source)
+        category = category_list[position]
+        if is_current:
+            self.structure = _get_structure(self.source)  # parsing a category doesn't change the menu
+        return category
+
+    def get_item(self, element_id: int) -> Optional[MenuItem]:
+        """
+        Get the item at the position of the first item with an element_id. After changes
+        to the menu it may be another item, or None.
+        """
+        position = self.item_positions.get(element_id)
+        if position is None:
+            return None
+        element_type, category_position, item_type, item_position = position
+        category = self.__get_category(element_type, category_position)
+        items = category.items.get(item_type) if category is not None else None
+        return items[item_position] if items is not None and item_position < len(items) else None
+
+    def get_category(self, element_id: int) -> Optional[MenuCategory]:
+        """
+        Get the category at the position of the first category with an element_id. After
+        changes to the menu it may be another category, or None.
+        """
+        positions = self.category_positions.get(element_id)
+        return self.__get_category(*positions[0]) if positions else None
+
+    def get_categories(self, element_id: int) -> List[Optional[MenuCategory]]:
+        """Get the categories at the positions of every category with an element_id, like get_category."""
+        return [self.__get_category(element_type, position)
+                for element_type, position in self.category_positions.get(element_id, ())]
+
+    @property
+    def items(self) -> List[MenuItem]:
+        """Get the first item of every element_id, parsing them all on first use."""
+        if self.__items is None:
+            self.__items = [self.source[element_type][category_position].items[item_type][item_position]
+                            for element_type, category_position, item_type, item_position
+                            in self.item_positions.values()]
+            self.structure = _get_structure(self.source)
+        return self.__items
+
+    @property
+    def items_by_flag(self) -> Dict[str, List[MenuItem]]:
+        """Get the items with each dietary flag set."""
+        if self.__items_by_flag is None:
+            self.__items_by_flag = {flag: [item for item in self.items if getattr(item, flag)]
+                                    for flag in self.DIETARY_FLAGS}
+        return self.__items_by_flag
+
+    def find_items_by_price(self, min_price=None, max_price=None) -> List[MenuItem]:
+        """Get items priced within an inclusive range, cheapest first."""
+        if self.__items_by_price is None:
+            self.__items_by_price = sorted(self.items, key=lambda item: item.price)
+            self.__prices = [item.price for item in self.__items_by_price]
+        start = bisect_left(self.__prices, min_price) if min_price is not None else 0
+        end = bisect_right(self.__prices, max_price) if max_price is not None else len(self.__prices)
+        return self.__items_by_price[start:end]
+
+
+@codec
+@dataclass(slots=True)
 class RestaurantMenuResponse:
     """Represents the full response from the restaurant menu API call."""
-    categories: Dict[int, List[MenuCategory]]
+    categories: Dict[int, List[MenuCategory]] = schema_field(skip=True)
     code: int
     msg: str
     http_code: int
+    _index: Optional[MenuIndex] = field(default=None, init=False, repr=False, compare=False)
     
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'RestaurantMenuResponse':
-        """Create a RestaurantMenuResponse instance from a dictionary."""
+    def from_dict(cls, data: Dict[str, Any], lazy: bool = False) -> 'RestaurantMenuResponse':
+        """
+        Create a RestaurantMenuResponse instance from a dictionary.
+        With `lazy`, categories and their items are only parsed when first accessed.
+        """
         categories = {}
         
         # Process each element type at the top level
         for key, value in data.items():
             if key.isdigit():
                 element_type = int(key)
+                if lazy:
+                    categories[element_type] = LazyElementList(value, partial(MenuCategory.from_dict, lazy=True))
+                    continue
                 categories[element_type] = []
                 
                 for category_data in value:
                     categories[element_type].append(MenuCategory.from_dict(category_data))
         
-        return cls(
-            categories=categories,
-            code=data.get('code', 0),
-            msg=data.get('msg', ''),
-            http_code=data.get('http_code', 0)
-        )
+        return cls._decode_fields(data, categories=categories)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the RestaurantMenuResponse instance to a dictionary."""
-        result = {
-            'code': self.code,
-            'msg': self.msg,
-            'http_code': self.http_code
-        }
+        result = self._encode_fields()
         
         # Add categories
         for element_type, categories in self.categories.items():
@@ -230,16 +359,83 @@ class RestaurantMenuResponse:
                 all_items.extend(category.get_all_items())
         return all_items
     
+    @property
+    def index(self) -> MenuIndex:
+        """Get the lookup index, building it on first use or when the categories dict was replaced."""
+        if self._index is None or self._index.source is not self.categories:
+            self._index = MenuIndex(self.categories)
+        return self._index
+
+    def __get_current_index(self) -> MenuIndex:
+        """
+        Get the lookup index, rebuilt if categories or items were added or removed since it was
+        built. That check costs a step per category, so lookups only make it on a miss.
+        """
+        if self._index is not None and self._index.structure != _get_structure(self.categories):
+            self._index = None
+        return self.index
+
+    def invalidate_index(self):
+        """
+        Drop the lookup index. Lookups notice added, removed and replaced categories and items,
+        but call this after changing their fields, e.g. the prices the price lookup is sorted by.
+        """
+        self._index = None
+
+    def add_category(self, category: MenuCategory, element_type: int = 12):
+        """Add a category to the menu."""
+        self.categories.setdefault(element_type, []).append(category)
+        self.invalidate_index()
+
+    def remove_category(self, element_id: int) -> Optional[MenuCategory]:
+        """Remove a category by its element_id and return it."""
+        for categories in self.categories.values():
+            for position, category in enumerate(categories):
+                if category.element_id == element_id:
+                    self.invalidate_index()
+                    return categories.pop(position)
+        return None
+
     def find_item_by_id(self, element_id: int) -> Optional[MenuItem]:
         """Find a menu item by its element_id."""
-        for item in self.get_all_items():
-            if item.element_id == element_id:
-                return item
-        return None
-    
+        item = self.index.get_item(element_id)
+        if item is not None and item.element_id == element_id:
+            return item
+        if item is not None:
+            self.invalidate_index()  # the item at the indexed position was replaced
+        return self.__get_current_index().get_item(element_id)
+
     def find_category_by_id(self, element_id: int) -> Optional[MenuCategory]:
         """Find a category by its element_id."""
-        for category in self.get_all_categories():
-            if category.element_id == element_id:
-                return category
-        return None
+        category = self.index.get_category(element_id)
+        if category is not None and category.element_id == element_id:
+            return category
+        if category is not None:
+            self.invalidate_index()  # the category at the indexed position was replaced
+        return self.__get_current_index().get_category(element_id)
+
+    def find_items_by_category(self, category_id: int) -> List[MenuItem]:
+        """Get the items of a category by the category's element_id."""
+        categories = self.index.get_categories(category_id)
+        if not categories or any(category is None or category.element_id != category_id for category in categories):
+            if categories:
+                self.invalidate_index()  # a category at an indexed position was replaced
+            categories = self.__get_current_index().get_categories(category_id)
+        return [item for category in categories for item in category.get_all_items()]
+
+    def find_items_by_price(self, min_price: Optional[int] = None, max_price: Optional[int] = None) -> List[MenuItem]:
+        """Get items priced within an inclusive range, cheapest first."""
+        return self.__get_current_index().find_items_by_price(min_price, max_price)
+
+    def find_items_by_diet(self, vegan: bool = False, vegetarian: bool = False,
+                           gluten_free: bool = False) -> List[MenuItem]:
+        """Get items matching every requested dietary flag."""
+        requested = [flag for flag, wanted in
+                     (('vegan', vegan), ('vegetarian', vegetarian), ('gluten_free', gluten_free)) if wanted]
+        index = self.__get_current_index()
+        if not requested:
+            return list(index.items)
+
+        # Start from the smallest list and filter it by the remaining flags
+        candidates = min((index.items_by_flag[flag] for flag in requested), key=len)
+        return [item for item in candidates if all(getattr(item, flag) for flag in requested)]
@@ -5,23 +5,17 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Dict, Any, Optional, ClassVar
 
+from .schema import codec, schema_field
 
-@dataclass
+
+@codec
+@dataclass(slots=True)
 class Logo:
     """Represents logo information for a restaurant."""
     logo: str
 
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'Logo':
-        """Create a Logo instance from a dictionary."""
-        return cls(logo=data.get('logo', ''))
-
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert the Logo instance to a dictionary."""
-        return {'logo': self.logo}
-
 
-@dataclass
+@dataclass(slots=True)
 class RequestedObject:
     """Represents an ordered item with its details."""
     object_id: int
@@ -51,12 +45,16 @@ class RequestedObject:
         return [self.object_id, self.variation_id, self.quantity, self.options]
 
 
-@dataclass
+@codec
+@dataclass(slots=True)
 class Order:
     """Represents a single order with all its details."""
     restaurant_id: int
     favorit_id: int
-    requested_objects: List[RequestedObject]
+    requested_objects: List[RequestedObject] = schema_field(
+        decode=lambda objects: [RequestedObject.from_list(obj) for obj in objects],
+        encode=lambda objects: [obj.to_list() for obj in objects]
+    )
     description: str
     order_type: int
     deal_id: int
@@ -66,16 +64,16 @@ class Order:
     rate: float
     rates: int
     price: int
-    date_str: str
-    is_open: bool
-    is_kosher: bool
+    date_str: str = schema_field(key='date')
+    is_open: bool = schema_field(coerce=bool, encode=int)
+    is_kosher: bool = schema_field(coerce=bool, encode=int)
     images: List[str]
     logos: Logo
-    is_web_order: bool
-    is_approved: bool
+    is_web_order: bool = schema_field(coerce=bool)
+    is_approved: bool = schema_field(coerce=bool)
     
     # Calculated fields
-    date: Optional[datetime] = None
+    date: Optional[datetime] = schema_field(skip=True, default=None)
     
     def __post_init__(self):
         """Process fields after initialization."""
@@ -87,69 +85,13 @@ class Order:
             except (ValueError, TypeError):
                 self.date = None
 
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'Order':
-        """Create an Order instance from a dictionary."""
-        requested_objects = []
-        for obj_data in data.get('requested_objects', []):
-            requested_objects.append(RequestedObject.from_list(obj_data))
-        
-        return cls(
-            restaurant_id=data.get('restaurant_id', 0),
-            favorit_id=data.get('favorit_id', 0),
-            requested_objects=requested_objects,
-            description=data.get('description', ''),
-            order_type=data.get('order_type', 0),
-            deal_id=data.get('deal_id', 0),
-            kitchen_type=data.get('kitchen_type', 0),
-            name=data.get('name', ''),
-            address=data.get('address', ''),
-            rate=data.get('rate', 0.0),
-            rates=data.get('rates', 0),
-            price=data.get('price', 0),
-            date_str=data.get('date', ''),
-            is_open=bool(data.get('is_open', 0)),
-            is_kosher=bool(data.get('is_kosher', 0)),
-            images=data.get('images', []),
-            logos=Logo.from_dict(data.get('logos', {'logo': ''})),
-            is_web_order=bool(data.get('is_web_order', False)),
-            is_approved=bool(data.get('is_approved', False))
-        )
-
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert the Order instance to a dictionary."""
-        requested_objects_data = []
-        for obj in self.requested_objects:
-            requested_objects_data.append(obj.to_list())
-        
-        return {
-            'restaurant_id': self.restaurant_id,
-            'favorit_id': self.favorit_id,
-            'requested_objects': requested_objects_data,
-            'description': self.description,
-            'order_type': self.order_type,
-            'deal_id': self.deal_id,
-            'kitchen_type': self.kitchen_type,
-            'name': self.name,
-            'address': self.address,
-            'rate': self.rate,
-            'rates': self.rates,
-            'price': self.price,
-            'date': self.date_str,
-            'is_open': 1 if self.is_open else 0,
-            'is_kosher': 1 if self.is_kosher else 0,
-            'images': self.images,
-            'logos': self.logos.to_dict(),
-            'is_web_order': self.is_web_order,
-            'is_approved': self.is_approved
-        }
-    
     def get_total_quantity(self) -> int:
         """Calculate the total quantity of items in this order."""
         return sum(obj.quantity for obj in self.requested_objects)
 
 
-@dataclass
+@codec
+@dataclass(slots=True)
 class PreviousOrdersResponse:
     """Represents the full response from the previous orders API call."""
     queue_orders: List[Order]
@@ -161,43 +103,6 @@ class PreviousOrdersResponse:
     # Class constants
     API_CALL_TYPE: ClassVar[str] = "prx_get_prev_orders"
     
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'PreviousOrdersResponse':
-        """Create a PreviousOrdersResponse instance from a dictionary."""
-        queue_orders = []
-        for order_data in data.get('queue_orders', []):
-            queue_orders.append(Order.from_dict(order_data))
-        
-        prev_orders = []
-        for order_data in data.get('prev_orders', []):
-            prev_orders.append(Order.from_dict(order_data))
-        
-        return cls(
-            queue_orders=queue_orders,
-            prev_orders=prev_orders,
-            code=data.get('code', 0),
-            msg=data.get('msg', ''),
-            http_code=data.get('http_code', 0)
-        )
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert the PreviousOrdersResponse instance to a dictionary."""
-        queue_orders_data = []
-        for order in self.queue_orders:
-            queue_orders_data.append(order.to_dict())
-        
-        prev_orders_data = []
-        for order in self.prev_orders:
-            prev_orders_data.append(order.to_dict())
-        
-        return {
-            'queue_orders': queue_orders_data,
-            'prev_orders': prev_orders_data,
-            'code': self.code,
-            'msg': self.msg,
-            'http_code': self.http_code
-        }
-    
     @property
     def is_success(self) -> bool:
         """Check if the response indicates success."""
@@ -0,0 +1,210 @@
+"""
+Incremental parsing of order history responses.
+
+The body of a `prx_user_deals` response is fed in chunks, and every entry of its
+`list` array is turned into an OrderHistoryItem as soon as it is complete, so the
+whole body, its parsed dicts and all items never have to be in memory together.
+"""
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from .cibus_order_history import OrderHistoryHead, OrderHistoryItem
+
+_WHITESPACE = ' \t\n\r'
+_COMPACT_THRESHOLD = 64 * 1024
+
+
+class OrderHistoryStreamParser:
+    """
+    Push parser for an order history body. `feed` chunks in and collect the items
+    each call returns; the other top-level keys (`head`, `code`, `msg`, `http_code`)
+    are set as soon as they are parsed.
+    """
+
+    def __init__(self):
+        self.head: Optional[OrderHistoryHead] = None
+        self.code: Optional[int] = None
+        self.msg: Optional[str] = None
+        self.http_code: Optional[int] = None
+        self.extra: Dict[str, Any] = {}
+        self.item_count = 0
+
+        self._decoder = json.JSONDecoder()
+        self._bytes_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._state = 'object_start'
+        self._key = None
+        self._closed = False
+
+    @property
+    def is_done(self) -> bool:
+        """Check if the closing brace of the body was parsed."""
+        return self._state == 'done'
+
+    def feed(self, chunk: Union[bytes, str]) -> List[OrderHistoryItem]:
+        """Add a chunk of the body and return the items completed by it."""
+        if isinstance(chunk, bytes):
+            chunk = self._bytes_decoder.decode(chunk)
+        self._buffer += chunk
+        return self._parse()
+
+    def close(self) -> List[OrderHistoryItem]:
+        """Signal the end of the body and return any remaining items."""
+        self._buffer += self._bytes_decoder.decode(b'', final=True)
+        self._closed = True
+        items = self._parse()
+        if self._state != 'done':
+            raise ValueError(f"Order history body ended unexpectedly (state: {self._state})")
+        return items
+
+    def _skip_whitespace(self) -> bool:
+        """Skip whitespace and report whether there's a character to look at."""
+        buffer, position = self._buffer, self._position
+        while position < len(buffer) and buffer[position] in _WHITESPACE:
+            position += 1
+        self._position = position
+        return position < len(buffer)
+
+    def _decode_value(self):
+        """Decode the next complete JSON value, or return (False, None) if more data is needed."""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._position)
+        except json.JSONDecodeError:
+            if self._closed:
+                raise
+            return False, None
+        # A number or literal at the very end of the buffer may continue in the next chunk
+        if end == len(self._buffer) and not self._closed and not isinstance(value, (dict, list, str)):
+            return False, None
+        self._position = end
+        return True, value
+
+    def _expect(self, expected: str) -> str:
+        character = self._buffer[self._position]
+        if character not in expected:
+            raise ValueError(f"Unexpected {character!r} in order history body, expected one of {expected!r}")
+        self._position += 1
+        return character
+
+    def _parse(self) -> List[OrderHistoryItem]:
+        items = []
+        while self._state != 'done' and self._skip_whitespace():
+            state = self._state
+            if state == 'object_start':
+                self._expect('{')
+                self._state = 'key_or_end'
+            elif state == 'key_or_end':
+                if self._buffer[self._position] == '}':
+                    self._position += 1
+                    self._state = 'done'
+                    continue
+                complete, self._key = self._decode_value()
+                if not complete:
+                    break
+                self._state = 'colon'
+            elif state == 'colon':
+                self._expect(':')
+                self._state = 'list_start' if self._key == 'list' else 'value'
+            elif state == 'value':
+                complete, value = self._decode_value()
+                if not complete:
+                    break
+                self._set_value(self._key, value)
+                self._state = 'after_value'
+            elif state == 'after_value':
+                self._state = 'key_or_end' if self._expect(',}') == ',' else 'done'
+            elif state == 'list_start':
+                self._expect('[')
+                self._state = 'item_or_end'
+            elif state == 'item_or_end':
+                if self._buffer[self._position] == ']':
+                    self._position += 1
+                    self._state = 'after_value'
+                    continue
+                complete, item_data = self._decode_value()
+                if not complete:
+                    break
+                items.append(OrderHistoryItem.from_dict(item_data))
+                self.item_count += 1
+                self._state = 'after_item'
+            elif state == 'after_item':
+                self._state = 'item_or_end' if self._expect(',]') == ',' else 'after_value'
+
+        # Drop the consumed part of the buffer once it gets large
+        if self._position > _COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._position:]
+            self._position = 0
+        return items
+
+    def _set_value(self, key, value):
+        if key == 'head':
+            self.head = OrderHistoryHead.from_dict(value)
+        elif key in ('code', 'msg', 'http_code'):
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+
+class OrderHistoryStream:
+    """
+    Iterates the OrderHistoryItems of a chunked order history body, once.
+
+    `head`, `code`, `msg` and `http_code` are available as soon as they've been
+    read; fields that come after `list` in the body are only set once iteration ends.
+    """
+
+    def __init__(self, chunks: Union[Iterable[Union[bytes, str]], AsyncIterable[Union[bytes, str]]],
+                 close: Optional[Callable[[], Any]] = None):
+        self._chunks = chunks
+        self._close = close
+        self._parser = OrderHistoryStreamParser()
+
+    @property
+    def head(self) -> Optional[OrderHistoryHead]:
+        return self._parser.head
+
+    @property
+    def code(self) -> Optional[int]:
+        return self._parser.code
+
+    @property
+    def msg(self) -> Optional[str]:
+        return self._parser.msg
+
+    @property
+    def http_code(self) -> Optional[int]:
+        return self._parser.http_code
+
+    @property
+    def item_count(self) -> int:
+        """Get the number of items yielded so far."""
+        return self._parser.item_count
+
+    @property
+    def is_success(self) -> bool:
+        """Check if the response indicates success."""
+        return self.code == 0 and self.http_code == 200
+
+    def __iter__(self) -> Iterator[OrderHistoryItem]:
+        try:
+            for chunk in self._chunks:
+                yield from self._parser.feed(chunk)
+            yield from self._parser.close()
+        finally:
+            if self._close is not None:
+                self._close()
+
+    async def __aiter__(self) -> AsyncIterator[OrderHistoryItem]:
+        try:
+            async for chunk in self._chunks:
+                for item in self._parser.feed(chunk):
+                    yield item
+            for item in self._parser.close():
+                yield item
+        finally:
+            if self._close is not None:
+                result = self._close()
+                if hasattr(result, '__await__'):
+                    await result
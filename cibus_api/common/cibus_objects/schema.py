@@ -0,0 +1,183 @@
+"""
+Declarative field schema for the Cibus API dataclasses.
+
+The `@codec` decorator reads a dataclass's fields once and compiles a specialized
+`from_dict`/`to_dict` pair for it, so adding an API field is a one-line change
+to the dataclass. Per-field behaviour is declared with `schema_field`:
+
+    display_price: float = schema_field(coerce=float)
+    date_str: str = schema_field(key='date')
+    datetime_obj: Optional[datetime] = schema_field(skip=True, default=None)
+
+Decoding defaults come from `schema_field(missing=...)`, then the dataclass
+default, then the annotation (str -> '', int -> 0, Optional[...] -> None, ...).
+"""
+import dataclasses
+import types
+import typing
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+_NOT_SET = object()
+
+
+@dataclass(frozen=True)
+class SchemaField:
+    """How a dataclass field maps to its API dict entry."""
+    key: Optional[str] = None  # API key, defaults to the field name
+    missing: Any = _NOT_SET  # value used when the key is absent
+    coerce: Optional[Callable[[Any], Any]] = None  # applied to the API value when decoding
+    decode: Optional[Callable[[Any], Any]] = None  # replaces the default decoding of the value
+    encode: Optional[Callable[[Any], Any]] = None  # applied to the attribute when encoding
+    skip: bool = False  # calculated or hand-decoded fields
+
+
+def schema_field(*, key=None, missing=_NOT_SET, coerce=None, decode=None, encode=None, skip=False,
+                 **field_kwargs) -> Any:
+    """A dataclasses.field carrying a SchemaField. Extra keyword arguments go to dataclasses.field."""
+    schema = SchemaField(key=key, missing=missing, coerce=coerce, decode=decode, encode=encode, skip=skip)
+    return dataclasses.field(metadata={'schema': schema}, **field_kwargs)
+
+
+def _has_codec(annotation) -> bool:
+    return isinstance(annotation, type) and hasattr(annotation, 'from_dict') and hasattr(annotation, 'to_dict')
+
+
+def _is_optional(annotation) -> bool:
+    origin = typing.get_origin(annotation)
+    return (origin is typing.Union or origin is types.UnionType) and type(None) in typing.get_args(annotation)
+
+
+def _infer_missing(annotation):
+    """Default API value for a field when the key is absent, inferred from its annotation."""
+    if _is_optional(annotation):
+        return None
+    origin = typing.get_origin(annotation) or annotation
+    if origin in (list, List):
+        return []
+    if origin in (dict, Dict):
+        return {}
+    if _has_codec(annotation):
+        return {}
+    for simple_type, value in ((bool, False), (str, ''), (int, 0), (float, 0.0)):
+        if annotation is simple_type:
+            return value
+    return None
+
+
+def _compile(name, source, namespace):
+    code = compile(source, f"<codec {name}>", 'exec')
+    exec(code, namespace)
+    function = namespace[name.rsplit('.', 1)[-1]]
+    function.__source__ = source
+    return function
+
+
+def _as_method(function, cls, name):
+    """Copy a compiled function under the name it's set on `cls` as, since pickle finds methods by name."""
+    method = types.FunctionType(function.__code__, function.__globals__, name, function.__defaults__,
+                                function.__closure__)
+    method.__qualname__ = f"{cls.__qualname__}.{name}"
+    method.__module__ = cls.__module__
+    method.__source__ = function.__source__
+    return method
+
+
+def build_codec(cls):
+    """Compile the `(decode, decode_with_extra, encode)` functions of a dataclass."""
+    namespace: Dict[str, Any] = {}
+    decode_args = []
+    encode_items = []
+
+    for position, field in enumerate(dataclasses.fields(cls)):
+        schema = field.metadata.get('schema', SchemaField())
+        if schema.skip or not field.init:
+            continue
+        key = schema.key or field.name
+        annotation = field.type
+
+        if schema.missing is not _NOT_SET:
+            missing = schema.missing
+        elif field.default is not dataclasses.MISSING:
+            missing = field.default
+        else:
+            missing = _infer_missing(annotation)
+
+        # Mutable defaults are built fresh for every decoded object, simple ones are inlined
+        if isinstance(missing, (list, dict)):
+            value = f"(data[{key!r}] if {key!r} in data else {missing!r})"
+        elif missing is None:
+            value = f"get({key!r})"
+        elif type(missing) in (str, int, float, bool):
+            value = f"get({key!r}, {missing!r})"
+        else:
+            namespace[f"_missing_{position}"] = missing
+            value = f"get({key!r}, _missing_{position})"
+
+        element = typing.get_args(annotation)[0] if typing.get_origin(annotation) is list else None
+        if schema.decode is not None:
+            namespace[f"_decode_{position}"] = schema.decode
+            value = f"_decode_{position}({value})"
+        elif _has_codec(annotation):
+            namespace[f"_decode_{position}"] = annotation.from_dict
+            value = f"_decode_{position}({value})"
+        elif element is not None and _has_codec(element):
+            namespace[f"_decode_{position}"] = element.from_dict
+            value = f"[_decode_{position}(element) for element in {value}]"
+        if schema.coerce is not None:
+            namespace[f"_coerce_{position}"] = schema.coerce
+            value = f"_coerce_{position}({value})"
+        decode_args.append(f"        {field.name}={value},")
+
+        attribute = f"self.{field.name}"
+        if schema.encode is not None:
+            namespace[f"_encode_{position}"] = schema.encode
+            attribute = f"_encode_{position}({attribute})"
+        elif _has_codec(annotation):
+            attribute = f"{attribute}.to_dict()"
+        elif element is not None and _has_codec(element):
+            attribute = f"[element.to_dict() for element in {attribute}]"
+        encode_items.append(f"        {key!r}: {attribute},")
+
+    def decode_source(name, signature, extra_arguments):
+        return "\n".join([
+            f"def {name}({signature}):",
+            "    get = data.get",
+            "    return cls(",
+            *decode_args,
+            *extra_arguments,
+            "    )",
+        ])
+
+    encode_source = "\n".join([
+        "def encode(self):",
+        "    return {",
+        *encode_items,
+        "    }",
+    ])
+    # A separate variant takes **extra, since unpacking it slows down every call
+    decode = _compile(f"{cls.__name__}.decode", decode_source("decode", "cls, data", []), dict(namespace))
+    decode_with_extra = _compile(
+        f"{cls.__name__}.decode_with_extra",
+        decode_source("decode_with_extra", "cls, data, **extra", ["        **extra"]),
+        dict(namespace)
+    )
+    encode = _compile(f"{cls.__name__}.encode", encode_source, dict(namespace))
+    return decode, decode_with_extra, encode
+
+
+def codec(cls):
+    """
+    Class decorator (applied above @dataclass) that adds the compiled `_decode_fields`
+    classmethod and `_encode_fields` method, and uses them as `from_dict`/`to_dict`
+    unless the class defines its own. `_decode_fields(data, **extra)` passes `extra`
+    on to the constructor, for skipped fields the class decodes by hand.
+    """
+    decode, decode_with_extra, encode = build_codec(cls)
+    cls._decode_fields = classmethod(_as_method(decode_with_extra, cls, '_decode_fields'))
+    cls._encode_fields = _as_method(encode, cls, '_encode_fields')
+    if 'from_dict' not in cls.__dict__:
+        cls.from_dict = classmethod(_as_method(decode, cls, 'from_dict'))
+    if 'to_dict' not in cls.__dict__:
+        cls.to_dict = _as_method(encode, cls, 'to_dict')
+    return cls
@@ -7,4 +7,10 @@ class ApiCallType(Enum):
     ADD_TO_CART = "prx_add_prod_to_cart"
     NEW_SITE_FLAG = "prx_newsite_flag"
     APPLY_ORDER = "prx_apply_order"
-    PREVIOUS_ORDERS = "prx_get_prev_orders"
\ No newline at end of file
+    PREVIOUS_ORDERS = "prx_get_prev_orders"
+
+
+# Idempotent, but changed by other calls (ADD_TO_CART, APPLY_ORDER), so they're never shared by single-flight
+UNSHARED_CALL_TYPES = frozenset({ApiCallType.CART_INFORMATION.value})
+# Calls after which results fetched before them (e.g. the order history) may be stale
+CART_CHANGING_CALL_TYPES = frozenset({ApiCallType.ADD_TO_CART.value, ApiCallType.APPLY_ORDER.value})
@@ -1,3 +1,6 @@
 class ApiConfig:
     """API configuration values"""
-    APP_ID = "E5D5FEF5-A05E-4C64-AEBA-BA0CECA0E402"
\ No newline at end of file
+    APP_ID = "E5D5FEF5-A05E-4C64-AEBA-BA0CECA0E402"
+    REQUEST_TIMEOUT = 30  # seconds
+    POOL_SIZE = 10  # keep-alive connections per host
+    AUTH_FAILURE_STATUSES = frozenset({401, 403})  # HTTP statuses of a rejected token
@@ -0,0 +1,80 @@
+"""
+Request payload builders shared by the sync and async Cibus API clients.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+from cibus_api.common.cibus_objects.cibus_dish import CibusDish
+from cibus_api.common.constants.api_call_type import ApiCallType
+
+DATE_FORMAT = '%d/%m/%Y'
+
+
+def format_api_date(value: Union[str, datetime]) -> str:
+    """Convert a datetime to the API date format and validate string dates."""
+    # Convert datetime objects to string format if needed
+    if isinstance(value, datetime):
+        return value.strftime(DATE_FORMAT)
+
+    # Validate date formats
+    try:
+        datetime.strptime(value, DATE_FORMAT)
+    except (ValueError, TypeError):
+        raise ValueError("Dates must be in 'DD/MM/YYYY' format")
+    return value
+
+
+def build_order_history_payload(from_date: Union[str, datetime], to_date: Union[str, datetime]) -> Dict[str, Any]:
+    """Build the request data for an ORDER_HISTORY call."""
+    return {
+        "from_date": format_api_date(from_date),
+        "to_date": format_api_date(to_date),
+        "type": ApiCallType.ORDER_HISTORY.value
+    }
+
+
+def build_cart_info_payload() -> Dict[str, Any]:
+    """Build the request data for a CART_INFORMATION call."""
+    return {"type": ApiCallType.CART_INFORMATION.value}
+
+
+def build_add_to_cart_payload(restaurant_id: int, dishes: Iterable[CibusDish]) -> Dict[str, Any]:
+    """Build the request data for an ADD_TO_CART call adding every dish at once."""
+    return {
+        "restaurant_id": restaurant_id,
+        "dish_list": [dish.to_dict() for dish in dishes],
+        "type": ApiCallType.ADD_TO_CART.value
+    }
+
+
+def build_apply_order_payload() -> Dict[str, Any]:
+    """Build the request data for an APPLY_ORDER call."""
+    return {"type": ApiCallType.APPLY_ORDER.value}
+
+
+def split_date_range(from_date: Union[str, datetime], to_date: Union[str, datetime],
+                     window: Union[int, str] = 30) -> List[Tuple[str, str]]:
+    """
+    Split an inclusive date range into consecutive windows of the API date format.
+    `window` is a number of days, or "week" / "month" for calendar-aligned windows.
+    """
+    start = datetime.strptime(format_api_date(from_date), DATE_FORMAT)
+    end = datetime.strptime(format_api_date(to_date), DATE_FORMAT)
+    if start > end:
+        raise ValueError("from_date must not be after to_date")
+
+    windows = []
+    while start <= end:
+        if window == "month":
+            next_start = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+        elif window == "week":
+            next_start = start + timedelta(days=7 - start.weekday())
+        elif isinstance(window, int) and window > 0:
+            next_start = start + timedelta(days=window)
+        else:
+            raise ValueError("window must be a positive number of days, 'week' or 'month'")
+
+        window_end = min(next_start - timedelta(days=1), end)
+        windows.append((start.strftime(DATE_FORMAT), window_end.strftime(DATE_FORMAT)))
+        start = next_start
+    return windows
@@ -0,0 +1,35 @@
+"""
+Retry policy used by the Cibus API clients.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import FrozenSet, Optional
+
+from cibus_api.common.constants.api_call_type import ApiCallType
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff for idempotent API calls."""
+    max_retries: int = 3
+    backoff_factor: float = 0.2
+    backoff_max: float = 5.0
+    retry_on_status: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+    idempotent_call_types: FrozenSet[str] = field(default_factory=lambda: frozenset({
+        ApiCallType.ORDER_HISTORY.value,
+        ApiCallType.CART_INFORMATION.value,
+        ApiCallType.NEW_SITE_FLAG.value,
+        ApiCallType.PREVIOUS_ORDERS.value,
+    }))
+
+    def is_retryable(self, call_type: Optional[str]) -> bool:
+        """Check if a call of the given type may be safely sent again."""
+        return self.max_retries > 0 and call_type in self.idempotent_call_types
+
+    def get_backoff(self, attempt: int) -> float:
+        """Get the delay before retry number `attempt` (1-based), using full jitter."""
+        ceiling = min(self.backoff_max, self.backoff_factor * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+NO_RETRY = RetryPolicy(max_retries=0)
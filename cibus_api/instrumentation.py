@@ -0,0 +1,229 @@
+"""
+Per-call instrumentation of the Cibus API clients.
+
+Every call produces a CallRecord with its network latency, payload sizes, retries,
+status code and the time spent decoding and parsing the response, which is handed
+to an Instrumentation's hooks and aggregated into per call type histograms.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+# Bucket upper bounds in seconds, from 0.5 ms to ~65 s in steps of sqrt(2)
+DEFAULT_BUCKETS = tuple(0.0005 * 2 ** (step / 2) for step in range(35))
+
+AUTH_CALL_TYPE = 'auth'
+
+
+@dataclass
+class CallRecord:
+    """Measurements of a single API call, including its retries."""
+    call_type: Optional[str]
+    url: str
+    started_at: float = field(default_factory=time.time)
+    status: Optional[int] = None
+    retries: int = 0
+    request_bytes: int = 0
+    response_bytes: Optional[int] = None  # None for streamed responses
+    network_time: float = 0.0  # sending the request(s) and reading the body, retries and backoff included
+    decode_time: float = 0.0  # json decoding
+    parse_time: float = 0.0  # from_dict
+    error: Optional[str] = None
+
+    @property
+    def total_time(self) -> float:
+        return self.network_time + self.decode_time + self.parse_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the CallRecord instance to a dictionary."""
+        return {**asdict(self), 'total_time': self.total_time}
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations, with exact count, sum, min and max."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one counts values above the largest bucket
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'Histogram'):
+        """Add the values of a histogram with the same buckets."""
+        if other.buckets != self.buckets:
+            raise ValueError("Can only merge histograms with the same buckets")
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Get the upper bound of the bucket holding the q-th percentile (0-100), capped by max."""
+        if not self.count:
+            return None
+        rank = max(1, round(q / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the histogram to a summary dictionary."""
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            'min': self.min,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+
+@dataclass
+class CallTypeStats:
+    """Aggregated records of a single call type."""
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    network_time: Histogram = field(default_factory=Histogram)
+    parse_time: Histogram = field(default_factory=Histogram)  # decoding and from_dict
+
+    def add(self, record: CallRecord):
+        self.calls += 1
+        self.errors += record.error is not None
+        self.retries += record.retries
+        self.request_bytes += record.request_bytes
+        self.response_bytes += record.response_bytes or 0
+        if record.status is not None:
+            self.statuses[record.status] += 1
+        self.network_time.add(record.network_time)
+        if record.decode_time or record.parse_time:
+            self.parse_time.add(record.decode_time + record.parse_time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the CallTypeStats instance to a dictionary."""
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'network_time': self.network_time.to_dict(),
+            'parse_time': self.parse_time.to_dict()
+        }
+
+
+class Instrumentation:
+    """
+    Collects CallRecords from any number of clients, in any number of threads.
+
+    Hooks are called with every record as it's completed; exceptions they raise are
+    logged and otherwise ignored, so a broken exporter can't fail an API call.
+    """
+    def __init__(self, hooks: Optional[List[Callable[[CallRecord], Any]]] = None):
+        self.hooks = list(hooks) if hooks else []
+        self.__stats: Dict[str, CallTypeStats] = {}
+        self.__lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[CallRecord], Any]):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[CallRecord], Any]):
+        self.hooks.remove(hook)
+
+    def record(self, record: CallRecord):
+        """Aggregate a completed call and pass it to the hooks."""
+        with self.__lock:
+            stats = self.__stats.get(record.call_type)
+            if stats is None:
+                stats = self.__stats[record.call_type] = CallTypeStats()
+            stats.add(record)
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception:
+                logging.getLogger(__name__).exception("Instrumentation hook %r failed", hook)
+
+    def get_stats(self) -> Dict[str, CallTypeStats]:
+        """Get the aggregated stats by call type."""
+        with self.__lock:
+            return dict(self.__stats)
+
+    def get_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Get the aggregated stats by call type as a dictionary."""
+        with self.__lock:
+            return {str(call_type): stats.to_dict() for call_type, stats in self.__stats.items()}
+
+    def format_summary(self) -> str:
+        """Get the aggregated stats as a table with times in milliseconds."""
+        lines = [f"{'call type':<22}{'calls':>7}{'errors':>7}{'retries':>8}"
+                 f"{'net p50':>9}{'net p99':>9}{'net max':>9}{'parse p50':>10}{'parse p99':>10}"]
+
+        def _ms(value):
+            return f"{value * 1000:.1f}" if value is not None else '-'
+
+        for call_type, stats in sorted(self.get_stats().items(), key=lambda item: str(item[0])):
+            lines.append(
+                f"{str(call_type):<22}{stats.calls:>7}{stats.errors:>7}{stats.retries:>8}"
+                f"{_ms(stats.network_time.percentile(50)):>9}{_ms(stats.network_time.percentile(99)):>9}"
+                f"{_ms(stats.network_time.max):>9}"
+                f"{_ms(stats.parse_time.percentile(50)):>10}{_ms(stats.parse_time.percentile(99)):>10}"
+            )
+        return '\n'.join(lines)
+
+    def reset(self):
+        """Drop the aggregated stats."""
+        with self.__lock:
+            self.__stats.clear()
+
+
+class LoggingExporter:
+    """Hook that logs every record on one line."""
+    def __init__(self, logger: Optional[logging.Logger] = None, level=logging.INFO):
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.level = level
+
+    def __call__(self, record: CallRecord):
+        self.logger.log(
+            self.level, "%s status=%s retries=%d net=%.1fms parse=%.1fms sent=%dB received=%sB%s",
+            record.call_type, record.status, record.retries, record.network_time * 1000,
+            (record.decode_time + record.parse_time) * 1000, record.request_bytes, record.response_bytes,
+            f" error={record.error}" if record.error else ''
+        )
+
+
+class JsonLinesExporter:
+    """Hook that appends every record to a JSON lines file."""
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = threading.Lock()
+
+    def __call__(self, record: CallRecord):
+        line = json.dumps(record.to_dict(), ensure_ascii=False) + '\n'
+        with self.__lock:
+            with open(self.path, 'a', encoding='utf-8') as records_file:
+                records_file.write(line)
@@ -0,0 +1,233 @@
+"""
+Restaurant menu cache with TTL, memory-bounded LRU eviction and optional disk storage.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from cibus_api.common.cibus_objects.cibus_menu import LazyElementList, MenuCategory, RestaurantMenuResponse
+from cibus_api.single_flight import SingleFlight
+
+# Average size in bytes of a category or item in a menu response, to estimate the size of menus
+# stored without the length of their response body
+ELEMENT_SIZE_ESTIMATE = 450
+
+
+@dataclass
+class MenuCacheEntry:
+    """A cached menu with its fetch time and estimated size."""
+    restaurant_id: int
+    menu: RestaurantMenuResponse
+    fetched_at: float
+    size: int
+
+
+@dataclass
+class MenuCacheStats:
+    """Counters of cache activity."""
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+    parsed_categories: int = 0
+    reused_categories: int = 0
+
+
+def _category_key(data: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+    return data.get('element_id'), data.get('elm_hash'), data.get('elm_desc_hash')
+
+
+def _estimate_size(raw_menu: Dict[str, Any]) -> int:
+    """Estimate the size of a raw menu from its number of categories and items."""
+    elements = 0
+    for key, raw_categories in raw_menu.items():
+        if key.isdigit():
+            for raw_category in raw_categories:
+                elements += 1 + sum(len(raw_items) for element_type, raw_items in raw_category.items()
+                                    if element_type.isdigit() and int(element_type) != raw_category.get('element_type'))
+    return elements * ELEMENT_SIZE_ESTIMATE
+
+
+def _parsed_categories(menu: RestaurantMenuResponse) -> Dict[Tuple[int, Tuple[Any, Any, Any]], MenuCategory]:
+    """Map (element_type, (element_id, elm_hash, elm_desc_hash)) to the already parsed categories of a menu."""
+    parsed = {}
+    for element_type, categories in menu.categories.items():
+        for position in range(len(categories)):
+            # Lazy categories that were never accessed are cheaper to re-create than to reuse
+            if isinstance(categories, LazyElementList) and not categories.is_parsed(position):
+                continue
+            category = categories[position]
+            parsed[(element_type, (category.element_id, category.elm_hash, category.elm_desc_hash))] = category
+    return parsed
+
+
+class MenuCache:
+    """
+    Menus keyed by restaurant id.
+
+    Entries are fresh for `ttl` seconds and the least recently used ones are evicted
+    once their estimated size goes over `max_bytes`. When a menu is stored again,
+    categories whose element_id, elm_hash and elm_desc_hash didn't change are reused
+    from the previous version instead of being parsed again.
+    """
+    def __init__(self, ttl=6 * 60 * 60, max_bytes=64 * 1024 * 1024, cache_dir=None, lazy=False):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.lazy = lazy  # parse changed categories on first access
+        self.stats = MenuCacheStats()
+        self.__entries: 'OrderedDict[int, MenuCacheEntry]' = OrderedDict()
+        self.__total_size = 0
+        self.__lock = threading.RLock()
+        self.__single_flight = SingleFlight()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def total_size(self) -> int:
+        """Get the estimated size in bytes of all cached menus."""
+        return self.__total_size
+
+    def __disk_path(self, restaurant_id) -> str:
+        return os.path.join(self.cache_dir, f"{restaurant_id}.json")
+
+    def __is_fresh(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at < self.ttl
+
+    def get(self, restaurant_id) -> Optional[RestaurantMenuResponse]:
+        """Get a fresh cached menu from memory or disk, or None."""
+        with self.__lock:
+            entry = self.__entries.get(restaurant_id)
+            if entry is not None and self.__is_fresh(entry.fetched_at):
+                self.__entries.move_to_end(restaurant_id)
+                self.stats.hits += 1
+                return entry.menu
+
+        if self.cache_dir:
+            stored = self.__read_disk(restaurant_id)
+            if stored is not None and self.__is_fresh(stored['fetched_at']):
+                with self.__lock:
+                    self.stats.disk_hits += 1
+                return self.__store(restaurant_id, stored['menu'], stored['fetched_at'], write_disk=False).menu
+
+        with self.__lock:
+            self.stats.misses += 1
+        return None
+
+    def put(self, restaurant_id, raw_menu: Dict[str, Any], size: Optional[int] = None) -> RestaurantMenuResponse:
+        """
+        Parse and cache a raw menu response, reusing unchanged categories.
+        `size` is the length in bytes of the response body, it's estimated when not given.
+        """
+        return self.__store(restaurant_id, raw_menu, time.time(), write_disk=bool(self.cache_dir), size=size).menu
+
+    def get_or_fetch(self, restaurant_id, fetch: Callable[[], Dict[str, Any]]) -> RestaurantMenuResponse:
+        """
+        Get a fresh cached menu, or call `fetch` for the raw response and cache it.
+        Concurrent misses of the same restaurant share a single fetch.
+        """
+        menu = self.get(restaurant_id)
+        if menu is None:
+            menu = self.__single_flight.do(restaurant_id, lambda: self.put(restaurant_id, fetch()))
+        return menu
+
+    def invalidate(self, restaurant_id):
+        """Drop a restaurant's menu from memory and disk."""
+        with self.__lock:
+            entry = self.__entries.pop(restaurant_id, None)
+            if entry is not None:
+                self.__total_size -= entry.size
+        if self.cache_dir:
+            try:
+                os.remove(self.__disk_path(restaurant_id))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Drop every menu from memory. Disk files are kept."""
+        with self.__lock:
+            self.__entries.clear()
+            self.__total_size = 0
+
+    def __parse(self, raw_menu: Dict[str, Any], previous: Optional[RestaurantMenuResponse]) -> RestaurantMenuResponse:
+        reusable = _parsed_categories(previous) if previous is not None else {}
+        categories = {}
+        parsed_count = reused_count = 0
+        for key, raw_categories in raw_menu.items():
+            if not key.isdigit():
+                continue
+            element_type = int(key)
+            if self.lazy:
+                parsed = LazyElementList(raw_categories, partial(MenuCategory.from_dict, lazy=True))
+            else:
+                parsed = [None] * len(raw_categories)
+
+            for position, raw_category in enumerate(raw_categories):
+                # Without a hash there's no way to tell the category didn't change
+                category = None
+                if raw_category.get('elm_hash'):
+                    category = reusable.get((element_type, _category_key(raw_category)))
+                if category is not None:
+                    parsed[position] = category
+                    reused_count += 1
+                elif not self.lazy:
+                    parsed[position] = MenuCategory.from_dict(raw_category)
+                    parsed_count += 1
+            categories[element_type] = parsed
+
+        with self.__lock:
+            self.stats.parsed_categories += parsed_count
+            self.stats.reused_categories += reused_count
+        return RestaurantMenuResponse._decode_fields(raw_menu, categories=categories)
+
+    def __store(self, restaurant_id, raw_menu, fetched_at, write_disk, size=None) -> MenuCacheEntry:
+        with self.__lock:
+            previous = self.__entries.get(restaurant_id)
+        menu = self.__parse(raw_menu, previous.menu if previous is not None else None)
+        # Only serialized for the disk, the size is otherwise estimated without walking every field
+        serialized = json.dumps(raw_menu, ensure_ascii=False) if write_disk else None
+        if size is None:
+            size = len(serialized.encode('utf-8')) if serialized is not None else _estimate_size(raw_menu)
+        entry = MenuCacheEntry(restaurant_id=restaurant_id, menu=menu, fetched_at=fetched_at, size=size)
+
+        with self.__lock:
+            old = self.__entries.pop(restaurant_id, None)
+            if old is not None:
+                self.__total_size -= old.size
+            self.__entries[restaurant_id] = entry
+            self.__total_size += entry.size
+            # Evict least recently used menus, but always keep the one just stored
+            while self.__total_size > self.max_bytes and len(self.__entries) > 1:
+                _, evicted = self.__entries.popitem(last=False)
+                self.__total_size -= evicted.size
+                self.stats.evictions += 1
+
+        if write_disk:
+            self.__write_disk(restaurant_id, serialized, fetched_at)
+        return entry
+
+    def __read_disk(self, restaurant_id) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.__disk_path(restaurant_id), encoding='utf-8') as menu_file:
+                return json.load(menu_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def __write_disk(self, restaurant_id, serialized_menu: str, fetched_at: float):
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.menu-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as menu_file:
+                menu_file.write(f'{{"fetched_at": {fetched_at!r}, "menu": {serialized_menu}}}')
+            os.replace(temp_path, self.__disk_path(restaurant_id))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
@@ -0,0 +1,296 @@
+"""
+Searchable catalog of the menu items of many restaurants.
+
+Item names and descriptions go into an inverted index of normalized tokens, and
+price, the dietary flags and spice_level_name get indexes of their own, so a query
+like "vegan salad under 40" intersects a few posting sets and a price range
+instead of scanning every item. Restaurants are added and removed one at a time.
+
+Hebrew text is normalized before indexing and searching: niqqud and cantillation
+marks are dropped, final letters are mapped to their regular forms and geresh and
+gershayim are removed, so "צ׳יפס" matches "ציפס". A token starting with one of the
+prefix letters (ו, ה, ב, ל, מ, ש, כ) is also indexed without it, so "סלט" matches "הסלט".
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from cibus_api.common.cibus_objects.cibus_menu import MenuItem, RestaurantMenuResponse
+
+FINAL_LETTERS = str.maketrans({'ך': 'כ', 'ם': 'מ', 'ן': 'נ', 'ף': 'פ', 'ץ': 'צ'})
+PREFIX_LETTERS = frozenset('והבלמשכ')
+DIETARY_FLAGS = ('vegan', 'vegetarian', 'gluten_free')
+
+# Geresh, gershayim and the ASCII quotes typed in their place, e.g. in צ'יפס and שניצל"ים
+_QUOTES = re.compile('[׳״\'"`’]')
+_TOKEN = re.compile(r'\w+')
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase text and drop niqqud, final letter forms, geresh and gershayim."""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _QUOTES.sub('', stripped).translate(FINAL_LETTERS).casefold()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into normalized tokens."""
+    return _TOKEN.findall(normalize_text(text))
+
+
+def _index_tokens(text: Optional[str]) -> Set[str]:
+    """Get the tokens a text is indexed under, prefix-stripped Hebrew variants included."""
+    tokens = set()
+    for token in tokenize(text):
+        tokens.add(token)
+        # Only strip where at least 3 letters are left, short words are mostly not prefixed
+        if len(token) >= 4 and token[0] in PREFIX_LETTERS:
+            tokens.add(token[1:])
+    return tokens
+
+
+@dataclass
+class CatalogEntry:
+    """A menu item of a restaurant."""
+    restaurant_id: int
+    category_id: int
+    item: MenuItem
+
+
+@dataclass
+class CatalogQuery:
+    """Conditions an entry has to meet, all of them."""
+    text: str = ''  # every token has to start a token of the name or description
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    vegan: bool = False
+    vegetarian: bool = False
+    gluten_free: bool = False
+    spice_levels: Optional[Iterable[str]] = None  # any of these spice_level_name values
+    restaurant_ids: Optional[Iterable[int]] = None
+
+    @classmethod
+    def parse(cls, text: str) -> 'CatalogQuery':
+        """
+        Parse a free text query such as "vegan salad under 40" or "סלט טבעוני עד 40".
+        Dietary words and price bounds become conditions, the rest is searched for.
+        """
+        query = cls()
+        text = normalize_text(text)
+        for pattern, apply in _QUERY_PATTERNS:
+            match = pattern.search(text)
+            while match:
+                apply(query, match)
+                text = text[:match.start()] + ' ' + text[match.end():]
+                match = pattern.search(text)
+        query.text = ' '.join(text.split())
+        return query
+
+
+def _set_flag(flag: str):
+    def apply(query: CatalogQuery, match):
+        setattr(query, flag, True)
+    return apply
+
+
+def _set_price(attribute: str):
+    def apply(query: CatalogQuery, match):
+        setattr(query, attribute, float(match.group('price')))
+    return apply
+
+
+def _set_price_range(query: CatalogQuery, match):
+    query.min_price = float(match.group('low'))
+    query.max_price = float(match.group('high'))
+
+
+def _words(*words: str) -> str:
+    return '|'.join(re.escape(normalize_text(word)) for word in words)
+
+
+_PRICE = r'\s*(?P<price>\d+(?:\.\d+)?)\s*(?:₪|שח|nis)?'
+_QUERY_PATTERNS = [
+    (re.compile(r'(?P<low>\d+(?:\.\d+)?)\s*-\s*(?P<high>\d+(?:\.\d+)?)'), _set_price_range),
+    (re.compile(rf'(?:^|\s)(?:{_words("under", "below", "up to", "upto", "max", "עד", "מתחת ל")}|<=?){_PRICE}'),
+     _set_price('max_price')),
+    (re.compile(rf'(?:^|\s)(?:{_words("over", "above", "from", "min", "מעל", "מ")}|>=?){_PRICE}'),
+     _set_price('min_price')),
+    (re.compile(rf'(?:^|\s)(?:{_words("gluten free", "gluten-free", "ללא גלוטן", "נטול גלוטן")})(?=\s|$)'),
+     _set_flag('gluten_free')),
+    (re.compile(rf'(?:^|\s)(?:{_words("vegan", "טבעוני", "טבעונית", "טבעוניים")})(?=\s|$)'), _set_flag('vegan')),
+    (re.compile(rf'(?:^|\s)(?:{_words("vegetarian", "צמחוני", "צמחונית", "צמחוניים")})(?=\s|$)'),
+     _set_flag('vegetarian')),
+]
+
+
+class MenuCatalog:
+    """
+    Inverted, price, flag and spice level indexes over the items of many menus.
+
+    An item listed in several categories of a menu is cataloged once, under the
+    first of them. Adding a restaurant that is already cataloged replaces it.
+    """
+    def __init__(self, menus: Optional[Dict[int, RestaurantMenuResponse]] = None):
+        self.__entries: Dict[int, CatalogEntry] = {}  # by entry id
+        self.__entry_tokens: Dict[int, Set[str]] = {}
+        self.__by_restaurant: Dict[int, Dict[int, int]] = {}  # element_id to entry id
+        self.__postings: Dict[str, Set[int]] = {}
+        self.__vocabulary: List[str] = []  # sorted tokens, for prefix matching
+        self.__by_flag: Dict[str, Set[int]] = {flag: set() for flag in DIETARY_FLAGS}
+        self.__by_spice_level: Dict[str, Set[int]] = {}
+        self.__prices: List[Tuple[float, int]] = []  # sorted (price, entry id)
+        self.__next_id = 0
+        self.__lock = threading.RLock()
+        if menus:
+            self.add_menus(menus)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, restaurant_id) -> bool:
+        return restaurant_id in self.__by_restaurant
+
+    @property
+    def restaurant_ids(self) -> List[int]:
+        return list(self.__by_restaurant)
+
+    def add_menus(self, menus: Dict[int, RestaurantMenuResponse]):
+        """Add or replace the menus of many restaurants."""
+        for restaurant_id, menu in menus.items():
+            self.add_restaurant(restaurant_id, menu)
+
+    def add_restaurant(self, restaurant_id: int, menu: RestaurantMenuResponse) -> int:
+        """Add or replace a restaurant's menu. Returns the number of entries added."""
+        entries = []
+        seen = set()
+        for category in menu.get_all_categories():
+            for item in category.get_all_items():
+                if item.element_id not in seen:
+                    seen.add(item.element_id)
+                    entries.append(CatalogEntry(restaurant_id, category.element_id, item))
+        # Tokenizing is the costly part, so it's done before taking the lock
+        tokens = [_index_tokens(entry.item.name) | _index_tokens(entry.item.description) for entry in entries]
+
+        with self.__lock:
+            self.remove_restaurant(restaurant_id)
+            restaurant_entries = self.__by_restaurant[restaurant_id] = {}
+            prices = []
+            for entry, entry_tokens in zip(entries, tokens):
+                entry_id = self.__next_id
+                self.__next_id += 1
+                self.__entries[entry_id] = entry
+                self.__entry_tokens[entry_id] = entry_tokens
+                restaurant_entries[entry.item.element_id] = entry_id
+                for token in entry_tokens:
+                    posting = self.__postings.get(token)
+                    if posting is None:
+                        posting = self.__postings[token] = set()
+                        insort(self.__vocabulary, token)
+                    posting.add(entry_id)
+                for flag in DIETARY_FLAGS:
+                    if getattr(entry.item, flag):
+                        self.__by_flag[flag].add(entry_id)
+                spice_level = normalize_text(entry.item.spice_level_name)
+                if spice_level:
+                    self.__by_spice_level.setdefault(spice_level, set()).add(entry_id)
+                prices.append((entry.item.price or 0, entry_id))
+            # Sorting the concatenation merges the two sorted runs in linear time
+            self.__prices.extend(sorted(prices))
+            self.__prices.sort()
+        return len(entries)
+
+    def remove_restaurant(self, restaurant_id: int) -> bool:
+        """Remove a restaurant's entries. Returns False if it wasn't cataloged."""
+        with self.__lock:
+            restaurant_entries = self.__by_restaurant.pop(restaurant_id, None)
+            if restaurant_entries is None:
+                return False
+            removed = set(restaurant_entries.values())
+            for entry_id in removed:
+                entry = self.__entries.pop(entry_id)
+                for token in self.__entry_tokens.pop(entry_id):
+                    posting = self.__postings[token]
+                    posting.discard(entry_id)
+                    if not posting:
+                        del self.__postings[token]
+                        del self.__vocabulary[bisect_left(self.__vocabulary, token)]
+                for flag in DIETARY_FLAGS:
+                    self.__by_flag[flag].discard(entry_id)
+                spice_level = normalize_text(entry.item.spice_level_name)
+                if spice_level:
+                    level_entries = self.__by_spice_level[spice_level]
+                    level_entries.discard(entry_id)
+                    if not level_entries:
+                        del self.__by_spice_level[spice_level]
+            self.__prices = [price for price in self.__prices if price[1] not in removed]
+            return True
+
+    def get_entries(self, restaurant_id: int) -> List[CatalogEntry]:
+        """Get the entries of a restaurant."""
+        with self.__lock:
+            return [self.__entries[entry_id] for entry_id in self.__by_restaurant.get(restaurant_id, {}).values()]
+
+    def get_spice_levels(self) -> List[str]:
+        """Get the normalized spice_level_name values of the cataloged items."""
+        with self.__lock:
+            return sorted(self.__by_spice_level)
+
+    def __get_term_entries(self, term: str) -> Set[int]:
+        """Get the entries with a token starting with `term`."""
+        start = bisect_left(self.__vocabulary, term)
+        matched = set()
+        for token in self.__vocabulary[start:bisect_right(self.__vocabulary, term + '\uffff', lo=start)]:
+            matched |= self.__postings[token]
+        return matched
+
+    def __get_price_range(self, min_price, max_price) -> Tuple[int, int]:
+        start = bisect_left(self.__prices, (min_price, -1)) if min_price is not None else 0
+        end = bisect_right(self.__prices, (max_price, float('inf'))) if max_price is not None else len(self.__prices)
+        return start, max(start, end)
+
+    def search(self, query, limit: Optional[int] = None) -> List[CatalogEntry]:
+        """
+        Get the entries matching a CatalogQuery, or a free text query parsed with
+        CatalogQuery.parse, cheapest first.
+        """
+        if isinstance(query, str):
+            query = CatalogQuery.parse(query)
+
+        with self.__lock:
+            # Every condition narrows the entries down to a set, smallest sets first
+            candidate_sets = [self.__get_term_entries(term) for term in tokenize(query.text)]
+            candidate_sets.extend(self.__by_flag[flag] for flag in DIETARY_FLAGS if getattr(query, flag))
+            if query.spice_levels is not None:
+                levels = {normalize_text(level) for level in query.spice_levels}
+                candidate_sets.append(set().union(*(self.__by_spice_level.get(level, ()) for level in levels)))
+            if query.restaurant_ids is not None:
+                candidate_sets.append({entry_id for restaurant_id in query.restaurant_ids
+                                       for entry_id in self.__by_restaurant.get(restaurant_id, {}).values()})
+
+            start, end = self.__get_price_range(query.min_price, query.max_price)
+            if not candidate_sets:
+                matched = [entry_id for _, entry_id in self.__prices[start:end]]
+            else:
+                candidate_sets.sort(key=len)
+                candidates = set(candidate_sets[0])
+                for candidate_set in candidate_sets[1:]:
+                    if not candidates:
+                        break
+                    candidates &= candidate_set
+                if len(candidates) < end - start:
+                    # Fewer candidates than priced entries, so check their prices directly
+                    priced = sorted((self.__entries[entry_id].item.price or 0, entry_id) for entry_id in candidates)
+                    matched = [entry_id for price, entry_id in priced
+                               if (query.min_price is None or price >= query.min_price)
+                               and (query.max_price is None or price <= query.max_price)]
+                else:
+                    matched = [entry_id for _, entry_id in self.__prices[start:end] if entry_id in candidates]
+
+            if limit is not None:
+                matched = matched[:limit]
+            return [self.__entries[entry_id] for entry_id in matched]
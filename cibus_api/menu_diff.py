@@ -0,0 +1,154 @@
+"""
+Diffing of two RestaurantMenuResponse snapshots.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from cibus_api.common.cibus_objects.cibus_menu import MenuCategory, MenuElement, RestaurantMenuResponse
+
+# Hashes describe the content, they aren't content themselves
+IGNORED_FIELDS = frozenset({'elm_hash', 'elm_desc_hash'})
+
+
+@dataclass
+class ElementChange:
+    """An element present in both snapshots whose fields differ."""
+    element_id: int
+    old: MenuElement
+    new: MenuElement
+    changed_fields: List[str]
+    old_category_id: Optional[int] = None
+    new_category_id: Optional[int] = None
+
+    @property
+    def price_delta(self) -> int:
+        """Get the price difference between the snapshots."""
+        return self.new.price - self.old.price
+
+
+@dataclass
+class MenuDiff:
+    """Elements added, removed, repriced and otherwise changed between two menus."""
+    added: List[MenuElement] = field(default_factory=list)
+    removed: List[MenuElement] = field(default_factory=list)
+    repriced: List[ElementChange] = field(default_factory=list)
+    changed: List[ElementChange] = field(default_factory=list)
+    skipped_categories: int = 0  # categories whose hashes matched, so their items weren't compared
+
+    @property
+    def is_empty(self) -> bool:
+        """Check if the menus have no differences."""
+        return not (self.added or self.removed or self.repriced or self.changed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the MenuDiff instance to a dictionary of element ids."""
+        return {
+            'added': [element.element_id for element in self.added],
+            'removed': [element.element_id for element in self.removed],
+            'repriced': [
+                {'element_id': change.element_id, 'old_price': change.old.price, 'new_price': change.new.price}
+                for change in self.repriced
+            ],
+            'changed': [
+                {'element_id': change.element_id, 'fields': change.changed_fields} for change in self.changed
+            ],
+            'skipped_categories': self.skipped_categories
+        }
+
+
+def _categories_by_id(menu: RestaurantMenuResponse) -> Dict[int, MenuCategory]:
+    # Iterating categories doesn't parse the items of lazy menus
+    categories = {}
+    for category_list in menu.categories.values():
+        for category in category_list:
+            categories.setdefault(category.element_id, category)
+    return categories
+
+
+def _items_by_id(category: MenuCategory) -> Dict[int, MenuElement]:
+    items = {}
+    for item_list in category.items.values():
+        for item in item_list:
+            items.setdefault(item.element_id, item)
+    return items
+
+
+def _is_unchanged(old: MenuElement, new: MenuElement) -> bool:
+    """Check whether the hashes prove the element and its children are unchanged."""
+    if old is new:
+        return True
+    return bool(old.elm_hash) and old.elm_hash == new.elm_hash and old.elm_desc_hash == new.elm_desc_hash
+
+
+def _compare(diff: MenuDiff, old: MenuElement, new: MenuElement,
+             old_category_id: Optional[int] = None, new_category_id: Optional[int] = None):
+    old_fields = MenuElement._encode_fields(old)
+    new_fields = MenuElement._encode_fields(new)
+    changed_fields = [name for name, value in new_fields.items()
+                      if name not in IGNORED_FIELDS and old_fields.get(name) != value]
+    if old_category_id != new_category_id:
+        changed_fields.append('category')
+    if not changed_fields:
+        return
+
+    change = ElementChange(element_id=new.element_id, old=old, new=new, changed_fields=changed_fields,
+                           old_category_id=old_category_id, new_category_id=new_category_id)
+    if 'price' in changed_fields:
+        diff.repriced.append(change)
+    if any(name != 'price' for name in changed_fields):
+        diff.changed.append(change)
+
+
+def diff_menus(old_menu: RestaurantMenuResponse, new_menu: RestaurantMenuResponse) -> MenuDiff:
+    """
+    Compare two menus by element_id. Categories whose elm_hash and elm_desc_hash
+    match are skipped without looking at their items, so the cost follows the
+    size of the change rather than the size of the menu.
+    """
+    diff = MenuDiff()
+    old_categories = _categories_by_id(old_menu)
+    new_categories = _categories_by_id(new_menu)
+
+    # Items that left or joined a category, matched up afterwards to detect moves
+    removed_items: Dict[int, tuple] = {}
+    added_items: Dict[int, tuple] = {}
+
+    for category_id, new_category in new_categories.items():
+        old_category = old_categories.get(category_id)
+        if old_category is None:
+            diff.added.append(new_category)
+            for item_id, item in _items_by_id(new_category).items():
+                added_items.setdefault(item_id, (item, category_id))
+            continue
+        if _is_unchanged(old_category, new_category):
+            diff.skipped_categories += 1
+            continue
+
+        _compare(diff, old_category, new_category)
+        old_items = _items_by_id(old_category)
+        new_items = _items_by_id(new_category)
+        for item_id, new_item in new_items.items():
+            old_item = old_items.get(item_id)
+            if old_item is None:
+                added_items.setdefault(item_id, (new_item, category_id))
+            elif not _is_unchanged(old_item, new_item):
+                _compare(diff, old_item, new_item, category_id, category_id)
+        for item_id, old_item in old_items.items():
+            if item_id not in new_items:
+                removed_items.setdefault(item_id, (old_item, category_id))
+
+    for category_id, old_category in old_categories.items():
+        if category_id not in new_categories:
+            diff.removed.append(old_category)
+            for item_id, item in _items_by_id(old_category).items():
+                removed_items.setdefault(item_id, (item, category_id))
+
+    for item_id, (new_item, new_category_id) in added_items.items():
+        moved = removed_items.pop(item_id, None)
+        if moved is None:
+            diff.added.append(new_item)
+        else:
+            old_item, old_category_id = moved
+            _compare(diff, old_item, new_item, old_category_id, new_category_id)
+    diff.removed.extend(item for item, _ in removed_items.values())
+    return diff
@@ -0,0 +1,159 @@
+"""
+Local SQLite store of order history, synced incrementally per account.
+"""
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Union
+
+from cibus_api.common.cibus_objects.cibus_order_history import OrderHistoryItem
+from cibus_api.common.request_builders import DATE_FORMAT, format_api_date
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    account TEXT NOT NULL,
+    deal_id INTEGER NOT NULL,
+    order_date TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, deal_id)
+);
+CREATE INDEX IF NOT EXISTS deals_by_date ON deals (account, order_date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    account TEXT PRIMARY KEY,
+    high_water_date TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+UPSERT_DEAL = "INSERT OR REPLACE INTO deals (account, deal_id, order_date, data) VALUES (?, ?, ?, ?)"
+
+
+def _to_iso_date(value: Union[str, datetime]) -> str:
+    """Convert an API date (DD/MM/YYYY) or datetime to a sortable YYYY-MM-DD string."""
+    return datetime.strptime(format_api_date(value), DATE_FORMAT).strftime('%Y-%m-%d')
+
+
+class OrderHistoryStore:
+    """
+    Persists OrderHistoryItem rows keyed by (account, deal_id).
+
+    Each account keeps a high-water mark: the last date fully synced. A sync only
+    fetches from that date minus `overlap_days`, so recent status changes
+    (e.g. refunds) are picked up again, and replaces the stored deals of those days,
+    so deals removed upstream are dropped.
+    """
+    def __init__(self, path="order_history.sqlite3", overlap_days=3, initial_days=365):
+        self.path = path
+        self.overlap_days = overlap_days
+        self.initial_days = initial_days  # how far back the first sync of an account goes
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self.__connection.close()
+
+    @staticmethod
+    def __to_rows(account: str, items: List[OrderHistoryItem]) -> List[tuple]:
+        rows = []
+        for item in items:
+            order_date = item.datetime_obj.strftime('%Y-%m-%d') if item.datetime_obj else ''
+            rows.append((account, item.deal_id, order_date, json.dumps(item.to_dict(), ensure_ascii=False)))
+        return rows
+
+    def upsert(self, account: str, items: List[OrderHistoryItem]) -> int:
+        """Insert or replace order history rows of an account. Returns the number of rows written."""
+        rows = self.__to_rows(account, items)
+        with self.__lock, self.__connection:
+            self.__connection.executemany(UPSERT_DEAL, rows)
+        return len(rows)
+
+    def get_high_water_mark(self, account: str) -> Optional[datetime]:
+        """Get the last date fully synced for an account, or None if it was never synced."""
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT high_water_date FROM sync_state WHERE account = ?", (account,)
+            ).fetchone()
+        return datetime.strptime(row[0], '%Y-%m-%d') if row else None
+
+    def get_synced_at(self, account: str) -> Optional[float]:
+        """Get the unix time of the last sync of an account."""
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT synced_at FROM sync_state WHERE account = ?", (account,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def sync(self, cibus_api, account: str, to_date: Optional[datetime] = None,
+             min_interval: float = 0, window: Union[int, str] = 30) -> int:
+        """
+        Fetch the days after the account's high-water mark (minus the overlap window)
+        and store them. Skipped if the last sync was less than `min_interval` seconds ago.
+        Returns the number of rows written.
+        """
+        synced_at = self.get_synced_at(account)
+        if synced_at is not None and time.time() - synced_at < min_interval:
+            return 0
+
+        to_date = to_date if to_date is not None else datetime.now()
+        high_water_mark = self.get_high_water_mark(account)
+        if high_water_mark is None:
+            from_date = to_date - timedelta(days=self.initial_days)
+        else:
+            from_date = min(high_water_mark - timedelta(days=self.overlap_days), to_date)
+
+        if isinstance(window, int) and (to_date - from_date).days < window:
+            response = cibus_api.get_order_history_in_time_range(from_date=from_date, to_date=to_date)
+        else:
+            response = cibus_api.get_order_history_in_chunks(from_date=from_date, to_date=to_date, window=window)
+        if not response.is_success:
+            raise ValueError(f"Order history sync for {account} failed: {response.code} {response.msg}")
+
+        rows = self.__to_rows(account, response.list)
+        with self.__lock, self.__connection:
+            # The fetched days replace what's stored of them, so deals refunded or removed upstream go away
+            self.__connection.execute(
+                "DELETE FROM deals WHERE account = ? AND order_date >= ? AND order_date <= ?",
+                (account, from_date.strftime('%Y-%m-%d'), to_date.strftime('%Y-%m-%d'))
+            )
+            self.__connection.executemany(UPSERT_DEAL, rows)
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO sync_state (account, high_water_date, synced_at) VALUES (?, ?, ?)",
+                (account, to_date.strftime('%Y-%m-%d'), time.time())
+            )
+        return len(rows)
+
+    def get_items(self, account: str, from_date: Union[str, datetime, None] = None,
+                  to_date: Union[str, datetime, None] = None) -> List[OrderHistoryItem]:
+        """Get the stored orders of an account within an optional inclusive date range."""
+        query = "SELECT data FROM deals WHERE account = ?"
+        params = [account]
+        if from_date is not None:
+            query += " AND order_date >= ?"
+            params.append(_to_iso_date(from_date))
+        if to_date is not None:
+            query += " AND order_date <= ?"
+            params.append(_to_iso_date(to_date))
+        query += " ORDER BY order_date, deal_id"
+
+        with self.__lock:
+            rows = self.__connection.execute(query, params).fetchall()
+        return [OrderHistoryItem.from_dict(json.loads(row[0])) for row in rows]
+
+    def has_purchase_on(self, account: str, date: Union[str, datetime]) -> bool:
+        """Check if the account has any stored order on `date`."""
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT 1 FROM deals WHERE account = ? AND order_date = ? LIMIT 1",
+                (account, _to_iso_date(date))
+            ).fetchone()
+        return row is not None
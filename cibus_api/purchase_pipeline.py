@@ -0,0 +1,129 @@
+"""
+Cart-to-order purchase pipeline with as few sequential round trips as possible.
+
+The cart is tracked locally by the CibusApi client, so it's only read when its
+state is unknown, all dishes are added in one call, and dishes already in the cart
+aren't added again. A cart prepared ahead of time leaves a single round trip,
+`prx_apply_order`, on the critical path.
+"""
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from cibus_api.common.cibus_objects.cibus_cart import CartInfo
+from cibus_api.common.cibus_objects.cibus_dish import CibusDish
+
+STAGES = ("cart_read", "add_to_cart", "apply_order")
+
+
+class PurchaseError(Exception):
+    """Raised when the cart can't be placed as an order."""
+
+
+@dataclass
+class PurchaseResult:
+    """Outcome of a purchase with the duration of every stage that made a call."""
+    deal_id: Optional[int] = None
+    voucher_code: Optional[str] = None
+    total_price: float = 0.0
+    round_trips: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.timings.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the PurchaseResult instance to a dictionary."""
+        return {
+            'deal_id': self.deal_id,
+            'voucher_code': self.voucher_code,
+            'total_price': self.total_price,
+            'round_trips': self.round_trips,
+            'timings': self.timings,
+            'total_time': self.total_time
+        }
+
+
+class PurchasePipeline:
+    """Fills the cart of a CibusApi client and places it as an order."""
+    def __init__(self, cibus_api):
+        self.cibus_api = cibus_api
+
+    def __timed(self, result: PurchaseResult, stage: str, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            result.timings[stage] = result.timings.get(stage, 0.0) + time.perf_counter() - start
+            result.round_trips += 1
+
+    def __get_cart(self, result: PurchaseResult) -> CartInfo:
+        cart = self.cibus_api.cart
+        if cart is None:
+            cart = self.__timed(result, "cart_read", self.cibus_api.get_cart_info)
+            if not cart.is_success:
+                raise PurchaseError(f"Reading the cart failed: {cart.msg}")
+        return cart
+
+    @staticmethod
+    def __get_missing_dishes(cart: CartInfo, restaurant_id: int, dishes: List[CibusDish]) -> List[CibusDish]:
+        """Get the dishes to add so the cart holds exactly `dishes`, or raise if it holds others."""
+        if cart.is_empty or cart.restaurant_id != restaurant_id:
+            # Adding from another restaurant starts a new cart
+            return dishes
+        remaining = cart.get_dish_counts()
+        wanted = Counter(dish.dish_id for dish in dishes)
+        extra = remaining - wanted
+        if extra:
+            raise PurchaseError(f"The cart holds dishes that weren't requested: {sorted(extra)}")
+        missing = []
+        for dish in dishes:
+            if remaining[dish.dish_id] > 0:
+                remaining[dish.dish_id] -= 1
+            else:
+                missing.append(dish)
+        return missing
+
+    def prepare(self, restaurant_id: Optional[int] = None, dishes: Optional[Iterable[CibusDish]] = None,
+                result: Optional[PurchaseResult] = None) -> PurchaseResult:
+        """
+        Make sure the cart holds `dishes`, using at most a cart read and a single
+        add call. Meant to run ahead of time, so purchase() only has to apply the order.
+        """
+        result = result if result is not None else PurchaseResult()
+        cart = self.__get_cart(result)
+        if dishes is None:
+            return result
+
+        dishes = list(dishes)
+        missing = self.__get_missing_dishes(cart, restaurant_id, dishes)
+        if missing:
+            cart = self.__timed(result, "add_to_cart", self.cibus_api.add_product_to_cart, restaurant_id, missing)
+            if not cart.is_success:
+                raise PurchaseError(f"Adding dishes to the cart failed: {cart.msg}")
+        return result
+
+    def purchase(self, restaurant_id: Optional[int] = None,
+                 dishes: Optional[Iterable[CibusDish]] = None) -> PurchaseResult:
+        """
+        Place `dishes` as an order, or whatever the cart holds when no dishes are given.
+        Budget and emptiness are checked locally, so a doomed order costs no round trip.
+        """
+        result = self.prepare(restaurant_id, dishes)
+        cart = self.cibus_api.cart
+        if cart is not None:
+            if cart.is_empty:
+                raise PurchaseError("The cart is empty")
+            remaining_budget = cart.get_remaining_budget()
+            if remaining_budget is not None and remaining_budget < 0:
+                raise PurchaseError(f"The cart costs {cart.total_price} which is over the budget of {cart.budget}")
+
+        response = self.__timed(result, "apply_order", self.cibus_api.apply_cart_order)
+        if not response.is_success:
+            raise PurchaseError(f"Placing the order failed: {response.msg}")
+        result.deal_id = response.deal_id
+        result.voucher_code = response.voucher_code
+        result.total_price = response.total_price
+        return result
@@ -0,0 +1,154 @@
+"""
+Coalescing of identical concurrent calls.
+
+While a call for a key is in flight, other callers of the same key wait for it and
+get its result (or exception) instead of making their own call. Results can also
+be kept for a short `ttl`, so calls made right after it finished are answered too.
+Results are shared, not copied, so callers shouldn't mutate them.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+@dataclass
+class SingleFlightStats:
+    """Counters of how calls were answered."""
+    calls: int = 0  # calls that ran the function
+    coalesced: int = 0  # calls that waited for an in-flight call
+    cache_hits: int = 0  # calls answered by a cached result
+
+
+class _ResultCache:
+    """Results by key, expiring after `ttl` seconds, at most `max_entries` of them."""
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+
+    def get(self, key) -> tuple:
+        """Get (True, result) for a fresh entry, or (False, None)."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, result = entry
+        if time.monotonic() >= expires_at:
+            del self.entries[key]
+            return False, None
+        self.entries.move_to_end(key)
+        return True, result
+
+    def put(self, key, result):
+        if self.ttl <= 0:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces identical calls made from different threads."""
+    def __init__(self, ttl: float = 0, max_entries: int = 1024):
+        self.stats = SingleFlightStats()
+        self.__cache = _ResultCache(ttl, max_entries)
+        self.__in_flight: Dict[Hashable, _Call] = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """Call `function`, unless a call for `key` is in flight or cached, and return its result."""
+        with self.__lock:
+            found, result = self.__cache.get(key)
+            if found:
+                self.stats.cache_hits += 1
+                return result
+            call = self.__in_flight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self.__in_flight[key] = _Call()
+                self.stats.calls += 1
+            else:
+                self.stats.coalesced += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+                if call.error is None:
+                    self.__cache.put(key, call.result)
+            call.done.set()
+
+    def invalidate(self, key: Hashable = None):
+        """Drop the cached result of `key`, or of every key. In-flight calls aren't affected."""
+        with self.__lock:
+            self.__cache.invalidate(key)
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces identical calls made from different tasks of one event loop.
+
+    The call runs in its own task, so cancelling one of the waiting callers,
+    including the first one, doesn't cancel it for the others.
+    """
+    def __init__(self, ttl: float = 0, max_entries: int = 1024):
+        self.stats = SingleFlightStats()
+        self.__cache = _ResultCache(ttl, max_entries)
+        self.__in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `function()`, unless a call for `key` is in flight or cached, and return its result."""
+        found, result = self.__cache.get(key)
+        if found:
+            self.stats.cache_hits += 1
+            return result
+
+        task = self.__in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self.__in_flight[key] = task
+            task.add_done_callback(lambda done_task: self.__finish(key, done_task))
+            self.stats.calls += 1
+        else:
+            self.stats.coalesced += 1
+        return await asyncio.shield(task)
+
+    def __finish(self, key, task: asyncio.Task):
+        if self.__in_flight.get(key) is task:
+            del self.__in_flight[key]
+        # Retrieving the exception also keeps asyncio from warning when every caller was cancelled
+        if not task.cancelled() and task.exception() is None:
+            self.__cache.put(key, task.result())
+
+    def invalidate(self, key: Hashable = None):
+        """Drop the cached result of `key`, or of every key. In-flight calls aren't affected."""
+        self.__cache.invalidate(key)
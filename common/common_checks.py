@@ -1,20 +1,48 @@
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone, timedelta, time as day_time
+from typing import Optional
 
-def get_time_of_day(utc_offset: int = 3) -> str:
+def get_now(utc_offset: int = 3) -> datetime:
     tz = timezone(timedelta(hours=utc_offset))
-    return datetime.now(tz=tz).strftime('%H:%M')
+    return datetime.now(tz=tz)
+
+
+def get_time_of_day(utc_offset: int = 3) -> str:
+    return get_now(utc_offset).strftime('%H:%M')
+
 
+def parse_time_of_day(value: str) -> day_time:
+    """Parse 'HH:MM', 'HH:MM:SS' or 'HH:MM:SS.ffffff'."""
+    for time_format in ('%H:%M', '%H:%M:%S', '%H:%M:%S.%f'):
+        try:
+            return datetime.strptime(value, time_format).time()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid time of day {value!r}, expected HH:MM[:SS[.ffffff]]")
 
-def check_if_workday():
+
+def check_if_workday(day: Optional[datetime] = None, utc_offset: int = 3):
     """
     0 Monday
     ...
     4 Friday
     5 Saturday
     6 Sunday
+    Without `day`, today is taken at `utc_offset`, like check_if_time_in_window does.
     """
-    return datetime.now().weekday() not in [4, 5] # 0-4 represents Monday-Friday
+    day = day if day is not None else get_now(utc_offset)
+    return day.weekday() not in [4, 5] # 0-4 represents Monday-Friday
+
+
+def check_if_time_in_window(window_start: str, window_end: str, now: Optional[datetime] = None,
+                            utc_offset: int = 3) -> bool:
+    """Check if the time of day is within [window_start, window_end]. Windows may cross midnight."""
+    now = now if now is not None else get_now(utc_offset)
+    start, end, current = parse_time_of_day(window_start), parse_time_of_day(window_end), now.time()
+    if start <= end:
+        return start <= current <= end
+    return current >= start or current <= end
+
 
 if __name__ == '__main__':
     print(get_time_of_day())
-    print(check_if_workday())
\ No newline at end of file
+    print(check_if_workday())
@@ -1,6 +1,10 @@
+import os
+
+
 class ApiEndpoints:
-    AUTHORIZATION = "https://api.capir.pluxee.co.il/auth/authToken"
-    DATA = "https://api.consumers.pluxee.co.il/api/main.py"
+    # Can be pointed at another server, e.g. the local mock_server, through the environment
+    AUTHORIZATION = os.getenv("CIBUS_AUTH_URL", "https://api.capir.pluxee.co.il/auth/authToken")
+    DATA = os.getenv("CIBUS_DATA_URL", "https://api.consumers.pluxee.co.il/api/main.py")
 
 class UiEndpoints:
-    LOGIN = "https://consumers.pluxee.co.il/login"
\ No newline at end of file
+    LOGIN = "https://consumers.pluxee.co.il/login"
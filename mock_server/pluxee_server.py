@@ -0,0 +1,453 @@
+"""
+Local stand-in for the Pluxee API, for load and latency testing without network access.
+
+It serves the AUTHORIZATION endpoint and the DATA endpoint, which dispatches on the
+`type` field like the real `main.py`, with data from benchmarks.fixtures. Latency,
+error rate, throttling and the number of requests served at once are configurable.
+
+    python -m mock_server.pluxee_server --port 8080 --latency 0.05 --error-rate 0.02 --rate-limit 100
+
+and point the clients at it with
+
+    CIBUS_AUTH_URL=http://127.0.0.1:8080/auth/authToken CIBUS_DATA_URL=http://127.0.0.1:8080/api/main.py
+
+Cart payloads mirror CibusDish (`dish_list` of dish_id/dish_category/dish_price) since
+the real request shapes aren't documented.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.fixtures import make_order_history_response, make_previous_orders_response
+from cibus_api.common.constants.api_call_type import ApiCallType
+from cibus_api.common.request_builders import DATE_FORMAT
+
+AUTH_PATH = '/auth/authToken'
+DATA_PATH = '/api/main.py'
+STATS_PATH = '/_stats'
+ERROR_STATUSES = (500, 502, 503)
+
+
+@dataclass
+class MockServerConfig:
+    """Behavior of the mock server."""
+    latency: float = 0.0  # seconds added to every request
+    jitter: float = 0.0  # up to this many extra seconds, uniformly distributed
+    error_rate: float = 0.0  # fraction of DATA requests answered with a 5xx
+    rate_limit: Optional[float] = None  # requests per second before answering 429
+    burst: int = 10  # requests allowed at once on top of rate_limit
+    max_in_flight: Optional[int] = None  # concurrent requests before answering 503
+    strict_auth: bool = False  # only accept tokens issued by the AUTHORIZATION endpoint
+    accounts: Optional[Dict[str, str]] = None  # username to password, None accepts any login
+    history_items: int = 200  # generated past orders per account
+    previous_orders: int = 50
+    daily_budget: float = 40.0
+    seed: int = 0
+
+
+@dataclass
+class MockServerStats:
+    """Counters of what the mock server answered."""
+    requests: Counter = field(default_factory=Counter)  # by call type
+    statuses: Counter = field(default_factory=Counter)
+    logins: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the MockServerStats instance to a dictionary."""
+        return {
+            'requests': dict(self.requests),
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'logins': self.logins,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight
+        }
+
+
+@dataclass
+class MockAccount:
+    """Server-side state of a single account."""
+    username: str
+    history: List[Tuple[datetime, Dict[str, Any]]]
+    previous_orders: Dict[str, Any]
+    cart: Dict[str, Any] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _empty_cart() -> Dict[str, Any]:
+    return {'restaurant_id': None, 'dish_list': [], 'total_price': 0}
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> Optional[float]:
+        """Take a token, or return the seconds until one is available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rate
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections when many clients log in at once
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class MockPluxeeServer:
+    """
+    The mock server, run on a background thread:
+
+        with MockPluxeeServer(MockServerConfig(latency=0.05)) as server:
+            api = CibusApi(token, data_url=server.data_url)
+    """
+    def __init__(self, config: Optional[MockServerConfig] = None, host='127.0.0.1', port=0):
+        self.config = config if config is not None else MockServerConfig()
+        self.stats = MockServerStats()
+        self.__accounts: Dict[str, MockAccount] = {}
+        self.__tokens: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.__rng = random.Random(self.config.seed)
+        self.__next_deal_id = 9_000_000
+        self._bucket = _TokenBucket(self.config.rate_limit, self.config.burst) if self.config.rate_limit else None
+        self.__thread: Optional[threading.Thread] = None
+        self.httpd = _MockHTTPServer((host, port), self.__make_handler())
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def auth_url(self) -> str:
+        return self.base_url + AUTH_PATH
+
+    @property
+    def data_url(self) -> str:
+        return self.base_url + DATA_PATH
+
+    def start(self) -> 'MockPluxeeServer':
+        """Serve on a daemon thread."""
+        self.__thread = threading.Thread(target=self.httpd.serve_forever, name='mock-pluxee', daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        if self.__thread is not None:
+            self.httpd.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __get_account(self, username: str) -> MockAccount:
+        with self._lock:
+            account = self.__accounts.get(username)
+            if account is None:
+                # Every account gets its own, but reproducible, data
+                seed = self.config.seed + sum(map(ord, username))
+                history = make_order_history_response(self.config.history_items, seed=seed)['list']
+                account = MockAccount(
+                    username=username,
+                    history=[(datetime.strptime(item['date'], DATE_FORMAT), item) for item in history],
+                    previous_orders=make_previous_orders_response(self.config.previous_orders, seed=seed),
+                    cart=_empty_cart()
+                )
+                self.__accounts[username] = account
+            return account
+
+    def login(self, username: str, password: str) -> Optional[str]:
+        """Issue a token for valid credentials, or return None."""
+        accounts = self.config.accounts
+        if not username or (accounts is not None and accounts.get(username) != password):
+            return None
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.__tokens[token] = username
+            self.stats.logins += 1
+        return token
+
+    def get_username(self, token: Optional[str]) -> Optional[str]:
+        """Get the account of a token. Unknown tokens are their own account unless strict_auth is set."""
+        if not token:
+            return None
+        with self._lock:
+            username = self.__tokens.get(token)
+        if username is None and not self.config.strict_auth:
+            return token
+        return username
+
+    def _delay(self):
+        delay = self.config.latency
+        if self.config.jitter:
+            with self._lock:
+                delay += self.__rng.uniform(0, self.config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _injected_error(self) -> Optional[int]:
+        if not self.config.error_rate:
+            return None
+        with self._lock:
+            if self.__rng.random() < self.config.error_rate:
+                return self.__rng.choice(ERROR_STATUSES)
+        return None
+
+    def handle_data(self, username: str, data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Answer a DATA call of an authenticated account."""
+        call_type = data.get('type')
+        account = self.__get_account(username)
+        if call_type == ApiCallType.ORDER_HISTORY.value:
+            return 200, self.__order_history(account, data)
+        if call_type == ApiCallType.PREVIOUS_ORDERS.value:
+            return 200, account.previous_orders
+        if call_type == ApiCallType.NEW_SITE_FLAG.value:
+            return 200, {'flag': 1, 'code': 0, 'msg': '', 'http_code': 200}
+        if call_type == ApiCallType.CART_INFORMATION.value:
+            with account.lock:
+                return 200, {**account.cart, 'budget': self.config.daily_budget, 'code': 0, 'msg': '', 'http_code': 200}
+        if call_type == ApiCallType.ADD_TO_CART.value:
+            return self.__add_to_cart(account, data)
+        if call_type == ApiCallType.APPLY_ORDER.value:
+            return self.__apply_order(account)
+        return 400, {'code': 1, 'msg': f"Unknown type {call_type!r}", 'http_code': 400}
+
+    def __order_history(self, account: MockAccount, data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            from_date = datetime.strptime(data['from_date'], DATE_FORMAT)
+            to_date = datetime.strptime(data['to_date'], DATE_FORMAT)
+        except (KeyError, TypeError, ValueError):
+            return {'code': 1, 'msg': 'Invalid dates', 'http_code': 400}
+        with account.lock:
+            items = [item for date, item in account.history if from_date <= date <= to_date]
+        return {
+            'head': {'count': len(items), 'columns': [{'name': None, 'type': 'string', 'key': 'rest_name'}]},
+            'list': items,
+            'code': 0,
+            'msg': '',
+            'http_code': 200
+        }
+
+    def __add_to_cart(self, account: MockAccount, data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        dishes = data.get('dish_list')
+        if not isinstance(dishes, list) or not all(isinstance(dish, dict) and 'dish_id' in dish for dish in dishes):
+            return 400, {'code': 1, 'msg': 'dish_list is missing or invalid', 'http_code': 400}
+        with account.lock:
+            cart = account.cart
+            restaurant_id = data.get('restaurant_id')
+            if cart['dish_list'] and restaurant_id is not None and restaurant_id != cart['restaurant_id']:
+                # Like the site, a cart only holds dishes of a single restaurant
+                cart = _empty_cart()
+            if restaurant_id is not None:
+                cart['restaurant_id'] = restaurant_id
+            cart['dish_list'] = cart['dish_list'] + [
+                {'dish_id': dish['dish_id'], 'dish_category': dish.get('dish_category', 0),
+                 'dish_price': float(dish.get('dish_price', 0))}
+                for dish in dishes
+            ]
+            cart['total_price'] = sum(dish['dish_price'] for dish in cart['dish_list'])
+            account.cart = cart
+            return 200, {**cart, 'budget': self.config.daily_budget, 'code': 0, 'msg': '', 'http_code': 200}
+
+    def __apply_order(self, account: MockAccount) -> Tuple[int, Dict[str, Any]]:
+        with account.lock:
+            cart = account.cart
+            if not cart['dish_list']:
+                return 200, {'code': 2, 'msg': 'Cart is empty', 'http_code': 200}
+            if cart['total_price'] > self.config.daily_budget:
+                return 200, {'code': 3, 'msg': 'Cart is over budget', 'http_code': 200}
+            with self._lock:
+                self.__next_deal_id += 1
+                deal_id = self.__next_deal_id
+            now = datetime.now()
+            price = cart['total_price']
+            account.history.append((now.replace(hour=0, minute=0, second=0, microsecond=0), {
+                'rest_name': 'Mock Restaurant', 'date': now.strftime(DATE_FORMAT), 'time': now.strftime('%H:%M'),
+                'deal_id': deal_id, 'rule_name': 'daily', 'status': 'approved', 'voucher_code': f"V{deal_id}",
+                'display_price': str(price), 'coupon': 0, 'discount': 0, 'delivery_price': 0, 'price': price,
+                'etc_company_price': price, 'etc_employee_price': 0, 'otl_price': 0, 'order_type': 1,
+                'is_active': 1, 'restaurant_id': cart['restaurant_id'] or 0, 'logo': '',
+            }))
+            account.cart = _empty_cart()
+            return 200, {'deal_id': deal_id, 'voucher_code': f"V{deal_id}", 'total_price': price,
+                         'code': 0, 'msg': '', 'http_code': 200}
+
+    def __make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so clients can keep connections alive, like against the real API
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, so without TCP_NODELAY the body waits on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None):
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(payload)
+                with server._lock:
+                    server.stats.statuses[status] += 1
+
+            def _read_json(self) -> Optional[Dict[str, Any]]:
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    data = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return None
+                return data if isinstance(data, dict) else None
+
+            def _get_token(self) -> Optional[str]:
+                cookies = SimpleCookie(self.headers.get('Cookie', ''))
+                return cookies['token'].value if 'token' in cookies else None
+
+            def do_HEAD(self):
+                # Used by warm_up to open connections
+                self._send(200)
+
+            def do_GET(self):
+                if self.path == STATS_PATH:
+                    with server._lock:
+                        stats = server.stats.to_dict()
+                    self._send(200, stats)
+                else:
+                    self._send(404, {'code': 1, 'msg': 'Not found', 'http_code': 404})
+
+            def do_POST(self):
+                with server._lock:
+                    server.stats.in_flight += 1
+                    server.stats.peak_in_flight = max(server.stats.peak_in_flight, server.stats.in_flight)
+                    in_flight = server.stats.in_flight
+                try:
+                    self._handle_post(in_flight)
+                finally:
+                    with server._lock:
+                        server.stats.in_flight -= 1
+
+            def _handle_post(self, in_flight: int):
+                data = self._read_json()
+                path = self.path.split('?', 1)[0]
+                if path not in (AUTH_PATH, DATA_PATH):
+                    self._send(404, {'code': 1, 'msg': 'Not found', 'http_code': 404})
+                    return
+                if data is None:
+                    self._send(400, {'code': 1, 'msg': 'Body must be a JSON object', 'http_code': 400})
+                    return
+
+                call_type = 'auth' if path == AUTH_PATH else str(data.get('type'))
+                with server._lock:
+                    server.stats.requests[call_type] += 1
+
+                if server.config.max_in_flight is not None and in_flight > server.config.max_in_flight:
+                    self._send(503, {'code': 1, 'msg': 'Too many concurrent requests', 'http_code': 503})
+                    return
+                if server._bucket is not None:
+                    wait = server._bucket.acquire()
+                    if wait is not None:
+                        self._send(429, {'code': 1, 'msg': 'Too many requests', 'http_code': 429},
+                                   headers={'Retry-After': str(max(1, round(wait)))})
+                        return
+
+                server._delay()
+                if path == AUTH_PATH:
+                    self._handle_login(data)
+                    return
+
+                error_status = server._injected_error()
+                if error_status is not None:
+                    self._send(error_status, {'code': 1, 'msg': 'Injected error', 'http_code': error_status})
+                    return
+                username = server.get_username(self._get_token())
+                if username is None:
+                    self._send(401, {'code': 1, 'msg': 'Unauthorized', 'http_code': 401})
+                    return
+                status, body = server.handle_data(username, data)
+                self._send(status, body)
+
+            def _handle_login(self, data: Dict[str, Any]):
+                token = server.login(data.get('username', ''), data.get('password', ''))
+                if token is None:
+                    self._send(401, {'code': 1, 'msg': 'Invalid credentials', 'http_code': 401})
+                    return
+                self._send(200, {'token': token, 'code': 0, 'msg': '', 'http_code': 200},
+                           headers={'Set-Cookie': f"token={token}; Path=/; HttpOnly"})
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in of the Pluxee API.")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of DATA requests answered with a 5xx")
+    parser.add_argument("--rate-limit", type=float, help="requests per second before answering 429")
+    parser.add_argument("--burst", type=int, default=10, help="requests allowed at once on top of --rate-limit")
+    parser.add_argument("--max-in-flight", type=int, help="concurrent requests before answering 503")
+    parser.add_argument("--strict-auth", action="store_true", help="only accept tokens issued by a login")
+    parser.add_argument("--history-items", type=int, default=200, help="generated past orders per account")
+    parser.add_argument("--daily-budget", type=float, default=40.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = MockServerConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        max_in_flight=args.max_in_flight,
+        strict_auth=args.strict_auth,
+        history_items=args.history_items,
+        daily_budget=args.daily_budget,
+        seed=args.seed
+    )
+    server = MockPluxeeServer(config, host=args.host, port=args.port)
+    print(f"CIBUS_AUTH_URL={server.auth_url}")
+    print(f"CIBUS_DATA_URL={server.data_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,28 @@
+import pickle
+
+import pytest
+
+from benchmarks.fixtures import make_menu_response
+from cibus_api.common.cibus_objects.cibus_menu import MenuItem, RestaurantMenuResponse
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_menu_pickle_round_trip(lazy):
+    raw_menu = make_menu_response(categories=4, items_per_category=5)
+    menu = RestaurantMenuResponse.from_dict(raw_menu, lazy=lazy)
+    # Parses a category and one of its items, leaving the rest of a lazy menu unparsed
+    first_item = menu.find_item_by_id(raw_menu['12'][1]['13'][2]['element_id'])
+
+    restored = pickle.loads(pickle.dumps(menu))
+
+    assert restored == RestaurantMenuResponse.from_dict(raw_menu)
+    assert restored.find_item_by_id(first_item.element_id) == first_item
+    assert restored.to_dict() == menu.to_dict()
+
+
+def test_codec_methods_are_named_after_their_attributes():
+    assert MenuItem.from_dict.__name__ == 'from_dict'
+    assert MenuItem.from_dict.__qualname__ == 'MenuItem.from_dict'
+    assert MenuItem.to_dict.__name__ == 'to_dict'
+    assert MenuItem._decode_fields.__name__ == '_decode_fields'
+    assert MenuItem._encode_fields.__name__ == '_encode_fields'
@@ -0,0 +1,37 @@
+import random
+from datetime import datetime
+
+from benchmarks.fixtures import make_history_item, make_order_history_response
+from cibus_api.common.cibus_objects.cibus_order_history import OrderHistoryResponse
+from cibus_api.order_history_store import OrderHistoryStore
+
+
+class _FakeApi:
+    """Answers order history calls from a list of raw deals."""
+    def __init__(self, deals):
+        self.deals = deals
+
+    def get_order_history_in_time_range(self, from_date, to_date):
+        response = make_order_history_response(items=0)
+        response['list'] = [deal for deal in self.deals
+                            if from_date.date() <= datetime.strptime(deal['date'], '%d/%m/%Y').date() <= to_date.date()]
+        return OrderHistoryResponse.from_dict(response)
+
+
+def test_sync_drops_deals_removed_upstream(tmp_path):
+    rng = random.Random(0)
+    deals = [make_history_item(index, rng) for index in range(10)]  # one a day, 01/01/2024 to 10/01/2024
+    api = _FakeApi(deals)
+    to_date = datetime(2024, 1, 10)
+
+    with OrderHistoryStore(str(tmp_path / 'history.sqlite3'), overlap_days=3) as store:
+        assert store.sync(api, 'alice', to_date=to_date, window=1000) == 10
+
+        removed = deals.pop(8)  # refunded on 09/01/2024, within the overlap window
+        api.deals = deals
+        assert store.sync(api, 'alice', to_date=to_date, window=1000) == 3
+
+        stored_ids = [item.deal_id for item in store.get_items('alice')]
+        assert removed['deal_id'] not in stored_ids
+        assert stored_ids == [deal['deal_id'] for deal in deals]  # days before the window are kept
+        assert not store.has_purchase_on('alice', '09/01/2024')
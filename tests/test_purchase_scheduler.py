@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from auto_coupon_grabber.batch_runner import Account
+from auto_coupon_grabber.purchase_scheduler import PurchaseScheduler, PurchaseWindow
+from cibus_api.common.cibus_objects.cibus_dish import CibusDish
+from common.common_checks import get_now
+from common.end_points import ApiEndpoints
+from mock_server.pluxee_server import MockPluxeeServer, MockServerConfig
+
+
+def test_windows_beyond_the_warm_up_limit_still_purchase_on_a_shared_target(monkeypatch):
+    with MockPluxeeServer(MockServerConfig(latency=0.05)) as server:
+        monkeypatch.setattr(ApiEndpoints, 'AUTHORIZATION', server.auth_url)
+        monkeypatch.setattr(ApiEndpoints, 'DATA', server.data_url)
+        target = (get_now() + timedelta(seconds=3)).strftime('%H:%M:%S.%f')
+        windows = [
+            PurchaseWindow(account=Account(f'user{index}', 'password'), purchase_time=target, warm_up_lead=2,
+                           restaurant_id=1, dishes=[CibusDish(dish_id=index, dish_category=1, dish_price=20.0)])
+            for index in range(12)
+        ]
+
+        outcomes = PurchaseScheduler(windows, max_warm_ups=4).run_day()
+
+    assert [outcome.username for outcome in outcomes] == [window.account.username for window in windows]
+    assert [(outcome.skipped, outcome.error) for outcome in outcomes] == [(None, None)] * len(windows)
+    assert all(outcome.purchased and outcome.purchase_result['deal_id'] is not None for outcome in outcomes)
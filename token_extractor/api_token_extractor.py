@@ -0,0 +1,71 @@
+"""
+Browser-free login through the AUTHORIZATION endpoint.
+"""
+import time
+
+import requests
+from requests.exceptions import RequestException
+
+from cibus_api.common.constants.api_config import ApiConfig
+from cibus_api.instrumentation import AUTH_CALL_TYPE, CallRecord
+from common.end_points import ApiEndpoints
+
+
+class TokenExtractionError(Exception):
+    """Raised when a login attempt doesn't yield a token."""
+
+
+def extract_token_from_api(username, password, session=None, url=None, timeout=ApiConfig.REQUEST_TIMEOUT,
+                           instrumentation=None):
+    """
+    Log in with a single POST to the AUTHORIZATION endpoint and return the `token`.
+
+    The token is read from the `token` cookie the endpoint sets, like the UI login,
+    and from the JSON body as a fallback. The login is recorded to `instrumentation`
+    as an `auth` call. A session is only created, and closed, when none is passed.
+    """
+    if session is None:
+        with requests.Session() as session:
+            return extract_token_from_api(username, password, session, url, timeout, instrumentation)
+
+    url = url if url is not None else ApiEndpoints.AUTHORIZATION
+    headers = {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json',
+        'X-App-Id': ApiConfig.APP_ID,
+    }
+    data = {
+        "username": username,
+        "password": password,
+        "appId": ApiConfig.APP_ID
+    }
+
+    record = CallRecord(call_type=AUTH_CALL_TYPE, url=url)
+    start = time.perf_counter()
+    try:
+        response = session.post(url=url, json=data, headers=headers, timeout=timeout)
+        record.status = response.status_code
+        record.request_bytes = len(response.request.body or b'')
+        record.response_bytes = len(response.content)
+        response.raise_for_status()
+    except RequestException as e:
+        record.status = e.response.status_code if e.response is not None else None
+        record.error = f"{type(e).__name__}: {e}"
+        raise TokenExtractionError(f"Login request for {username} failed: {str(e)}")
+    finally:
+        record.network_time = time.perf_counter() - start
+        if instrumentation is not None:
+            instrumentation.record(record)
+
+    token = response.cookies.get("token") or session.cookies.get("token")
+    if not token:
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if isinstance(body, dict):
+            token = body.get("token") or body.get("access_token")
+    if not token:
+        raise TokenExtractionError(f"Login response for {username} didn't contain a token")
+    return token
+
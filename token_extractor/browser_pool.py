@@ -0,0 +1,89 @@
+"""
+Shared Playwright browser for logging in many accounts.
+"""
+import os
+from contextlib import contextmanager
+
+from playwright.sync_api import sync_playwright
+
+from token_extractor.token_extractor import extract_token_in_browser, extract_token_in_browser_fast
+
+
+class BrowserLoginPool:
+    """
+    Keeps one long-lived headless Chromium and logs every account in through its
+    own isolated BrowserContext, which is closed as soon as the login finishes.
+
+    The sync Playwright API is bound to the thread that started it, so use one
+    pool per worker thread.
+    """
+    def __init__(self, headless=True, trace_dir=None, fast=True):
+        self.headless = headless
+        self.fast = fast  # block non-essential resources and skip the fixed wait
+        self.trace_dir = trace_dir  # when set, failed logins save a trace here
+        self.__playwright = None
+        self.__browser = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """Launch the browser if it isn't running."""
+        if self.__playwright is None:
+            self.__playwright = sync_playwright().start()
+        if self.__browser is None or not self.__browser.is_connected():
+            self.__browser = self.__playwright.chromium.launch(headless=self.headless)
+        return self.__browser
+
+    def close(self):
+        """Close the browser and stop Playwright."""
+        try:
+            if self.__browser is not None:
+                self.__browser.close()
+        finally:
+            self.__browser = None
+            if self.__playwright is not None:
+                self.__playwright.stop()
+                self.__playwright = None
+
+    @contextmanager
+    def context(self, **context_options):
+        """Hand out a fresh isolated BrowserContext and close it afterwards."""
+        context = self.start().new_context(**context_options)
+        try:
+            yield context
+        finally:
+            context.close()
+
+    def __get_trace_path(self, username):
+        return os.path.join(self.trace_dir, f"trace-{username}.zip") if self.trace_dir else None
+
+    def login(self, username, password):
+        """Log an account in and return its token."""
+        if self.fast:
+            return self.login_with_timings(username, password).token
+        return extract_token_in_browser(self.start(), username, password, trace_path=self.__get_trace_path(username))
+
+    def login_with_timings(self, username, password):
+        """Log an account in using the fast flow and return a LoginResult with per-phase timings."""
+        return extract_token_in_browser_fast(self.start(), username, password, trace_path=self.__get_trace_path(username))
+
+    def refresh_tokens(self, accounts, token_cache=None):
+        """
+        Log in every (username, password) pair in turn, storing tokens in `token_cache`
+        when given. Returns a dict of username to token or to the raised exception.
+        """
+        results = {}
+        for username, password in accounts:
+            try:
+                token = self.login(username, password)
+                if token_cache is not None:
+                    token_cache.set(username, token)
+                results[username] = token
+            except Exception as e:
+                results[username] = e
+        return results
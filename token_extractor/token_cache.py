@@ -0,0 +1,145 @@
+"""
+On-disk token store keyed by username, safe to share between processes.
+"""
+import base64
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_TOKEN_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "auto_cibus", "tokens.json")
+
+
+@dataclass
+class CachedToken:
+    """A token together with its expiry information."""
+    token: str
+    obtained_at: float
+    expires_at: float
+
+    @property
+    def is_expired(self) -> bool:
+        """Check if the token's expiry time has passed."""
+        return time.time() >= self.expires_at
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CachedToken':
+        """Create a CachedToken instance from a dictionary."""
+        return cls(
+            token=data.get('token', ''),
+            obtained_at=data.get('obtained_at', 0.0),
+            expires_at=data.get('expires_at', 0.0)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the CachedToken instance to a dictionary."""
+        return {
+            'token': self.token,
+            'obtained_at': self.obtained_at,
+            'expires_at': self.expires_at
+        }
+
+
+def get_jwt_expiry(token: str) -> Optional[float]:
+    """Read the `exp` claim of a JWT without verifying it. Returns None for non-JWT tokens."""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+        return float(exp) if exp is not None else None
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return None
+
+
+class TokenCache:
+    """
+    JSON file of tokens keyed by username.
+
+    Reads and writes hold an OS-level lock on a side file, and writes replace the
+    cache file atomically, so several grabber processes can share one cache.
+    """
+    def __init__(self, path=DEFAULT_TOKEN_CACHE_PATH, default_ttl=12 * 60 * 60, expiry_margin=60):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.expiry_margin = expiry_margin  # treat tokens as expired slightly early
+        self.__lock_path = f"{path}.lock"
+
+    @contextmanager
+    def __locked(self, exclusive):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.__lock_path, 'a+') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def __read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, encoding='utf-8') as cache_file:
+                return json.load(cache_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def __write(self, entries):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tokens-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+                json.dump(entries, temp_file)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def get_entry(self, username) -> Optional[CachedToken]:
+        """Get the cached token entry of `username`, expired or not."""
+        with self.__locked(exclusive=False):
+            data = self.__read().get(username)
+        return CachedToken.from_dict(data) if data else None
+
+    def get(self, username) -> Optional[str]:
+        """Get the cached token of `username` if it hasn't expired."""
+        entry = self.get_entry(username)
+        if entry is None or entry.is_expired:
+            return None
+        return entry.token
+
+    def set(self, username, token, expires_at=None) -> CachedToken:
+        """Store a token. Expiry defaults to the JWT `exp` claim, or `default_ttl` from now."""
+        now = time.time()
+        if expires_at is None:
+            expires_at = get_jwt_expiry(token) or now + self.default_ttl
+        entry = CachedToken(token=token, obtained_at=now, expires_at=expires_at - self.expiry_margin)
+
+        with self.__locked(exclusive=True):
+            entries = self.__read()
+            # Drop expired entries while we hold the lock anyway
+            entries = {name: data for name, data in entries.items() if data.get('expires_at', 0) > now}
+            entries[username] = entry.to_dict()
+            self.__write(entries)
+        return entry
+
+    def invalidate(self, username):
+        """Remove the cached token of `username`."""
+        with self.__locked(exclusive=True):
+            entries = self.__read()
+            if entries.pop(username, None) is not None:
+                self.__write(entries)
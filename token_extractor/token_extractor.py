@@ -1,38 +1,162 @@
 import time
+from dataclasses import dataclass, field
+from typing import Dict
+from urllib.parse import urlsplit
+
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from common.end_points import ApiEndpoints, UiEndpoints
+from token_extractor.api_token_extractor import TokenExtractionError
+
+USERNAME_LABEL = "אימייל / מספר נייד / שם משתמש"
+PASSWORD_LABEL = "מה הסיסמה?"
+
+# Not needed to log in, blocked in fast mode
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+BLOCKED_URL_PARTS = ("google-analytics", "googletagmanager", "doubleclick", "facebook", "hotjar", "clarity.ms")
+# Seconds between checks for the token cookie, unless the auth response wakes the wait up first
+TOKEN_POLL_INTERVAL = 0.05
+
+
+@dataclass
+class LoginResult:
+    """A token together with how long each login phase took, in seconds."""
+    token: str
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def total_time(self) -> float:
+        """Get the duration of the whole login."""
+        return sum(self.timings.values())
 
-from playwright.sync_api import sync_playwright
-from common.end_points import UiEndpoints
 
 #todo: PoM
-def extract_token_from_ui(username, password):
-    with sync_playwright() as playwright:
+def _fill_login_form(page, username, password):
+    page.goto(UiEndpoints.LOGIN, wait_until="commit")
+    page.get_by_label(USERNAME_LABEL).click()
+    page.get_by_label(USERNAME_LABEL).fill(username)
+    page.get_by_label(USERNAME_LABEL).press("Enter")
+    page.wait_for_selector("#password")
+
+    page.get_by_label(PASSWORD_LABEL).click()
+    page.get_by_label(PASSWORD_LABEL).fill(password)
+    page.get_by_label(PASSWORD_LABEL).press("Enter")
 
-        browser = playwright.chromium.launch(headless=False
-                                             )
-        context = browser.new_context()
-        context.tracing.start(snapshots=True, screenshots=True,sources=True)
+    # page.get_by_role("button", name="כניסה").click()
+
+
+def _read_token_cookie(context):
+    storage = context.storage_state()
+    return [token.get("value") for token in storage["cookies"] if token.get("name") == "token"][0]
+
+
+def extract_token_in_browser(browser, username, password, trace_path=None):
+    """
+    Log in inside a fresh, isolated context of an already running browser.
+    The context is always closed. When `trace_path` is given, a trace is recorded
+    and saved there if the login fails.
+    """
+    context = browser.new_context()
+    try:
+        if trace_path:
+            context.tracing.start(snapshots=True, screenshots=True, sources=True)
         try:
             page = context.new_page()
+            _fill_login_form(page, username, password)
+            time.sleep(2)
+            return _read_token_cookie(context)
+        except Exception:
+            if trace_path:
+                context.tracing.stop(path=trace_path)
+            raise
+    finally:
+        context.close()
+
+
+def _block_non_essential(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(part in request.url for part in BLOCKED_URL_PARTS):
+        route.abort()
+    else:
+        route.continue_()
+
+
+def _is_auth_response(response):
+    # Compared by path only, so redirects and other hosts of the endpoint still match
+    return urlsplit(response.url).path == urlsplit(ApiEndpoints.AUTHORIZATION).path
+
+
+def _find_token(cookies):
+    for cookie in cookies:
+        if cookie.get("name") == "token":
+            return cookie.get("value")
+    return None
+
+
+def extract_token_in_browser_fast(browser, username, password, trace_path=None, timeout=30):
+    """
+    Like extract_token_in_browser, but blocks images, fonts, media and analytics,
+    and returns as soon as the `token` cookie appears instead of sleeping a fixed time.
+    Returns a LoginResult with per-phase timings.
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    def _mark(phase):
+        nonlocal start
+        now = time.perf_counter()
+        timings[phase] = now - start
+        start = now
+
+    context = browser.new_context()
+    try:
+        if trace_path:
+            context.tracing.start(snapshots=True, screenshots=True, sources=True)
+        try:
+            context.route("**/*", _block_non_essential)
+            page = context.new_page()
+            page.set_default_timeout(timeout * 1000)
+            _mark("context")
+
             page.goto(UiEndpoints.LOGIN, wait_until="commit")
-            page.get_by_label("אימייל / מספר נייד / שם משתמש").click()
-            page.get_by_label("אימייל / מספר נייד / שם משתמש").fill(username)
-            page.get_by_label("אימייל / מספר נייד / שם משתמש").press("Enter")
+            page.get_by_label(USERNAME_LABEL).fill(username)
+            page.get_by_label(USERNAME_LABEL).press("Enter")
             page.wait_for_selector("#password")
+            _mark("username")
 
-            page.get_by_label("מה הסיסמה?").click()
-            page.get_by_label("מה הסיסמה?").fill(password)
-            page.get_by_label("מה הסיסמה?").press("Enter")
-            time.sleep(2)
-            storage = context.storage_state()
-            auth_token = [token.get("value") for token in storage["cookies"] if token.get("name") == "token"][0]
-            return auth_token
+            page.get_by_label(PASSWORD_LABEL).fill(password)
+            page.get_by_label(PASSWORD_LABEL).press("Enter")
+            _mark("password")
 
-            # page.get_by_role("button", name="כניסה").click()
+            # Race the auth response against polling the cookies, so a response that doesn't
+            # match costs at most a poll interval instead of the whole timeout
+            deadline = time.monotonic() + timeout
+            token = _find_token(context.cookies())
+            while token is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TokenExtractionError(f"No token cookie for {username} after {timeout}s")
+                try:
+                    page.wait_for_event("response", predicate=_is_auth_response,
+                                        timeout=min(remaining, TOKEN_POLL_INTERVAL) * 1000)
+                except PlaywrightTimeoutError:
+                    pass
+                token = _find_token(context.cookies())
+            _mark("token")
+            return LoginResult(token=token, timings=timings)
+        except Exception:
+            if trace_path:
+                context.tracing.stop(path=trace_path)
+            raise
+    finally:
+        context.close()
 
-            context.close()
-            browser.close()
-            browser.stop_tracing()
 
-        except(Exception) as e:
-                context.tracing.stop(path="trace.zip")
-                raise e
+def extract_token_from_ui(username, password, headless=False, trace_path=None, fast=False):
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=headless)
+        try:
+            if fast:
+                return extract_token_in_browser_fast(browser, username, password, trace_path=trace_path).token
+            return extract_token_in_browser(browser, username, password, trace_path=trace_path)
+        finally:
+            browser.close()